@@ -0,0 +1,148 @@
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import CustomUser
+
+
+class UserStateCache:
+    """
+    A small thread-safe LRU of (is_active, is_staff, is_superuser) per user
+    id, each entry kept for ``ttl`` seconds. Saving or deleting a user
+    evicts its entry in this process; other processes notice within ``ttl``.
+    """
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cached(self, user_id, now):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                expires, state = entry
+                if expires > now:
+                    self._entries.move_to_end(user_id)
+                    return True, state
+                del self._entries[user_id]
+        return False, None
+
+    def _store(self, user_id, now, state):
+        with self._lock:
+            self._entries[user_id] = (now + self.ttl, state)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return state
+
+    def _query(self, user_id):
+        return CustomUser.objects.filter(pk=user_id).values_list('is_active', 'is_staff', 'is_superuser')
+
+    def get(self, user_id):
+        # Tokens carry the id as a string, signals as the primary key
+        user_id = str(user_id)
+        now = time.monotonic()
+        found, state = self._cached(user_id, now)
+        if found:
+            return state
+        return self._store(user_id, now, self._query(user_id).first())
+
+    async def aget(self, user_id):
+        """get() for async views, hits are answered without leaving the event loop."""
+        user_id = str(user_id)
+        now = time.monotonic()
+        found, state = self._cached(user_id, now)
+        if found:
+            return state
+        return self._store(user_id, now, await self._query(user_id).afirst())
+
+    def evict(self, user_id):
+        with self._lock:
+            self._entries.pop(str(user_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_states = UserStateCache(
+    size=getattr(settings, 'AUTH_USER_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'AUTH_USER_CACHE_TTL', 30),
+)
+
+
+class ClaimsUser(TokenUser):
+    """A TokenUser whose flags can come from the user state cache instead of the token."""
+
+    def __init__(self, token, is_active=True, is_staff=None, is_superuser=None):
+        super().__init__(token)
+        self.is_active = is_active
+        if is_staff is not None:
+            self.is_staff = is_staff
+        if is_superuser is not None:
+            self.is_superuser = is_superuser
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that doesn't load the user row on every request.
+
+    Tokens issued with ClaimsRefreshToken carry the user's email and roles,
+    and the request user is built from them. When AUTH_USER_CACHE_TTL is
+    set, which it is by default, the user's active and role flags are
+    checked against a per-process LRU that reads the users table at most
+    once per user per TTL. Deactivated or demoted users lose access
+    within that time instead of at token expiry. Set it to 0 for fully
+    stateless checks. Tokens without the claims, issued before this
+    class was used, fall back to loading the user.
+    """
+
+    def _has_claims(self, validated_token):
+        return 'is_staff' in validated_token and api_settings.USER_ID_CLAIM in validated_token
+
+    def _user_from_state(self, validated_token, state):
+        if state is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        is_active, is_staff, is_superuser = state
+        if not is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return ClaimsUser(validated_token, is_active, is_staff, is_superuser)
+
+    def get_user(self, validated_token):
+        if not self._has_claims(validated_token):
+            return super().get_user(validated_token)
+
+        if not user_states.ttl:
+            return ClaimsUser(validated_token)
+
+        state = user_states.get(validated_token[api_settings.USER_ID_CLAIM])
+        return self._user_from_state(validated_token, state)
+
+    async def aauthenticate(self, request):
+        """authenticate() for async views, taking a plain Django request."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+
+        if not self._has_claims(validated_token):
+            user = await sync_to_async(super().get_user)(validated_token)
+        elif not user_states.ttl:
+            user = ClaimsUser(validated_token)
+        else:
+            state = await user_states.aget(validated_token[api_settings.USER_ID_CLAIM])
+            user = self._user_from_state(validated_token, state)
+        return user, validated_token
@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    Django's PBKDF2-SHA256 hasher with the work factor taken from
+    PASSWORD_PBKDF2_ITERATIONS. It keeps the pbkdf2_sha256 algorithm name,
+    so existing hashes still verify. A hash made with a different count is
+    rewritten with the configured one the next time its user logs in.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_PBKDF2_ITERATIONS', None) or PBKDF2PasswordHasher.iterations
@@ -0,0 +1,66 @@
+import logging
+import time
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from api.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure logins per second for PBKDF2 iteration counts, and how fast a flood of failed logins "
+        "is refused. Runs against a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, nargs='+', default=[1_000_000, 600_000, 260_000],
+                            help='PBKDF2 iteration counts to compare')
+        parser.add_argument('--logins', type=int, default=20, help='Successful logins per iteration count')
+        parser.add_argument('--failures', type=int, default=200, help='Failed logins in the flood')
+
+    def handle(self, *args, **options):
+        # Every refused or failed login would otherwise log a warning
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            for iterations in options['iterations']:
+                with override_settings(PASSWORD_PBKDF2_ITERATIONS=iterations):
+                    rate = self.logins_per_second(options['logins'])
+                self.stdout.write(f"{iterations:>10} iterations: {rate:8.1f} logins/s")
+            self.flood(options['failures'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def logins_per_second(self, logins):
+        CustomUser.objects.all().delete()
+        CustomUser.objects.create_user(email="benchmark@example.com", password="benchmark")
+        client = Client()
+        # The first login rehashes the password at the new count, measure the ones after it
+        client.post('/api/login/', {'email': "benchmark@example.com", 'password': "benchmark"})
+        started = time.perf_counter()
+        for _ in range(logins):
+            response = client.post('/api/login/', {'email': "benchmark@example.com", 'password': "benchmark"})
+            assert response.status_code == 200, response.status_code
+        return logins / (time.perf_counter() - started)
+
+    def flood(self, failures):
+        caches['default'].clear()
+        client = Client()
+        timings = {401: [], 429: []}
+        for _ in range(failures):
+            started = time.perf_counter()
+            response = client.post('/api/login/', {'email': "benchmark@example.com", 'password': "wrong"})
+            timings[response.status_code].append(time.perf_counter() - started)
+        for code, label in ((401, "checked the password"), (429, "refused up front")):
+            if timings[code]:
+                self.stdout.write(
+                    f"Failed-login flood: {len(timings[code])} attempts {label}, "
+                    f"{len(timings[code]) / sum(timings[code]):.0f}/s"
+                )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.revocation import revoked_tokens
+
+
+class Command(BaseCommand):
+    help = "Delete revoked refresh tokens that have expired, e.g. from a daily cron job"
+
+    def handle(self, *args, **options):
+        deleted = revoked_tokens.purge()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired revoked tokens"))
@@ -39,3 +39,13 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     def __str__(self) -> str:
         return self.email
 
+
+
+class RevokedToken(models.Model):
+    """A logged-out refresh token, kept only until it would have expired anyway."""
+
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self) -> str:
+        return self.jti
@@ -0,0 +1,67 @@
+import datetime
+import threading
+import time
+
+from django.conf import settings
+
+from .models import RevokedToken
+
+
+class RevokedTokenStore:
+    """
+    Revoked refresh token ids, with their expiry.
+
+    A token found revoked is remembered in memory until it expires, so
+    repeated attempts with it are answered without a query. Tokens not
+    known here are looked up by their unique jti in the RevokedToken
+    table, which other processes write too. Expired rows are deleted in
+    one statement every ``purge_every`` revocations, which keeps the table,
+    and the cost of a lookup, bounded by the tokens revoked within one
+    refresh lifetime.
+    """
+
+    def __init__(self, purge_every=100):
+        self.purge_every = purge_every
+        self._known = {}
+        self._since_purge = 0
+        self._lock = threading.Lock()
+
+    def revoke(self, jti, expires):
+        RevokedToken.objects.bulk_create(
+            [RevokedToken(jti=jti, expires_at=datetime.datetime.fromtimestamp(expires, tz=datetime.timezone.utc))],
+            ignore_conflicts=True,
+        )
+        with self._lock:
+            self._known[jti] = expires
+            self._since_purge += 1
+            purge = self._since_purge >= self.purge_every
+        if purge:
+            self.purge()
+
+    def is_revoked(self, jti):
+        now = time.time()
+        with self._lock:
+            expires = self._known.get(jti)
+        if expires is not None and expires > now:
+            return True
+
+        expires_at = RevokedToken.objects.filter(jti=jti).values_list('expires_at', flat=True).first()
+        if expires_at is None:
+            return False
+        with self._lock:
+            self._known[jti] = expires_at.timestamp()
+        return True
+
+    def purge(self):
+        """Delete every expired revocation and return how many rows went."""
+        now = time.time()
+        with self._lock:
+            self._known = {jti: expires for jti, expires in self._known.items() if expires > now}
+            self._since_purge = 0
+        deleted, _ = RevokedToken.objects.filter(
+            expires_at__lte=datetime.datetime.fromtimestamp(now, tz=datetime.timezone.utc)
+        ).delete()
+        return deleted
+
+
+revoked_tokens = RevokedTokenStore(purge_every=getattr(settings, 'AUTH_REVOKED_TOKENS_PURGE_EVERY', 100))
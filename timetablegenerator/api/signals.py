@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import user_states
+from .models import CustomUser
+
+
+# Deactivation, role changes and deletion take effect on the next request in this process
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def evict_user_state(sender, instance, **kwargs):
+    user_states.evict(instance.pk)
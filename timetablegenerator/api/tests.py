@@ -1,3 +1,120 @@
-from django.test import TestCase
+import datetime
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .authentication import user_states
+from .models import CustomUser, RevokedToken
+from .revocation import revoked_tokens
+from .throttling import LoginAttemptLimiter
 
 # Create your tests here.
+
+
+class ClaimsAuthenticationTests(TestCase):
+    def setUp(self):
+        user_states.clear()
+        self.admin = CustomUser.objects.create_superuser(email="admin@example.com", password="pw")
+        response = APIClient().post('/api/admin/login/', {'email': "admin@example.com", 'password': "pw"})
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.json()['access']}")
+
+    def test_user_row_is_read_once_per_ttl(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/admin/details/')
+        self.assertEqual(response.json(), {'id': self.admin.id, 'email': "admin@example.com"})
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/admin/details/').status_code, 200)
+
+    def test_stateless_without_cache(self):
+        with mock.patch.object(user_states, 'ttl', 0), self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/admin/details/').status_code, 200)
+
+    def test_deactivation_and_demotion_apply_immediately(self):
+        self.client.get('/api/admin/details/')
+        self.admin.is_staff = False
+        self.admin.save()
+        self.assertEqual(self.client.get('/api/admin/details/').status_code, 403)
+        self.admin.is_active = False
+        self.admin.save()
+        self.assertEqual(self.client.get('/api/user/').status_code, 401)
+
+
+class LogoutTests(TestCase):
+    def setUp(self):
+        CustomUser.objects.create_user(email="student@example.com", password="pw")
+        self.client = APIClient()
+        tokens = self.client.post('/api/login/', {'email': "student@example.com", 'password': "pw"}).json()
+        self.refresh = tokens['refresh']
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+
+    def test_logged_out_refresh_token_is_rejected(self):
+        self.assertEqual(self.client.post('/api/token/refresh/', {'refresh': self.refresh}).status_code, 200)
+        self.assertEqual(self.client.post('/api/logout/', {'refresh': self.refresh}).status_code, 200)
+        self.assertEqual(self.client.post('/api/token/refresh/', {'refresh': self.refresh}).status_code, 401)
+
+    def test_expired_revocations_are_purged(self):
+        self.client.post('/api/logout/', {'refresh': self.refresh})
+        RevokedToken.objects.create(jti="old", expires_at=timezone.now() - datetime.timedelta(days=1))
+        self.assertEqual(revoked_tokens.purge(), 1)
+        self.assertEqual(list(RevokedToken.objects.values_list('jti', flat=True)), [RefreshToken(self.refresh)['jti']])
+
+
+class LoginProtectionTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        CustomUser.objects.create_user(email="student@example.com", password="pw")
+
+    def login(self, password):
+        return APIClient().post('/api/login/', {'email': "student@example.com", 'password': password})
+
+    @override_settings(AUTH_LOGIN_MAX_FAILURES_PER_EMAIL=3)
+    def test_failures_are_refused_before_hashing(self):
+        for _ in range(3):
+            self.assertEqual(self.login("wrong").status_code, 401)
+        with mock.patch('api.views.authenticate') as authenticate:
+            response = self.login("pw")
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(response['Retry-After'])
+        authenticate.assert_not_called()
+
+    @override_settings(AUTH_LOGIN_MAX_FAILURES_PER_EMAIL=1, AUTH_LOGIN_FAILURE_WINDOW=300)
+    def test_retry_after_is_what_is_left_of_the_window(self):
+        with mock.patch('api.throttling.time.time', return_value=1000.0):
+            self.login("wrong")
+        with mock.patch('api.throttling.time.time', return_value=1200.0):
+            response = self.login("pw")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '100')
+
+    @override_settings(AUTH_LOGIN_MAX_FAILURES_PER_IP=2, AUTH_TRUSTED_PROXY_COUNT=1)
+    def test_clients_behind_the_proxy_are_counted_apart(self):
+        client = APIClient(REMOTE_ADDR='10.0.0.1')
+        for address in ('1.1.1.1', '2.2.2.2'):
+            client.post('/api/login/', {'email': f"{address}@example.com", 'password': "x"},
+                        HTTP_X_FORWARDED_FOR=f"6.6.6.6, {address}")
+        response = client.post('/api/login/', {'email': "student@example.com", 'password': "pw"},
+                               HTTP_X_FORWARDED_FOR="1.1.1.1, 3.3.3.3")
+        self.assertEqual(response.status_code, 200)
+
+        client.post('/api/login/', {'email': "other@example.com", 'password': "x"}, HTTP_X_FORWARDED_FOR="1.1.1.1")
+        response = client.post('/api/login/', {'email': "student@example.com", 'password': "pw"},
+                               HTTP_X_FORWARDED_FOR="3.3.3.3, 1.1.1.1")
+        self.assertEqual(response.status_code, 429)
+
+    def test_defaults_match_the_settings(self):
+        with self.settings():
+            del settings.AUTH_LOGIN_MAX_FAILURES_PER_EMAIL, settings.AUTH_LOGIN_MAX_FAILURES_PER_IP
+            defaults = LoginAttemptLimiter()
+        configured = LoginAttemptLimiter()
+        self.assertEqual((defaults.per_email, defaults.per_ip), (configured.per_email, configured.per_ip))
+
+    def test_password_is_rehashed_when_cost_changes(self):
+        with override_settings(PASSWORD_PBKDF2_ITERATIONS=1000):
+            self.assertEqual(self.login("pw").status_code, 200)
+        self.assertTrue(CustomUser.objects.get().password.startswith("pbkdf2_sha256$1000$"))
@@ -0,0 +1,70 @@
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class LoginAttemptLimiter:
+    """
+    Counts failed logins per email and per client IP in fixed windows in
+    the cache. Once either count reaches its limit, further attempts are
+    refused before any password is hashed, so a flood of bad logins costs
+    a cache lookup each instead of a full PBKDF2 run. A successful login
+    resets the count for its email.
+    """
+
+    def __init__(self):
+        self.per_email = getattr(settings, 'AUTH_LOGIN_MAX_FAILURES_PER_EMAIL', 5)
+        self.per_ip = getattr(settings, 'AUTH_LOGIN_MAX_FAILURES_PER_IP', 200)
+        self.window = getattr(settings, 'AUTH_LOGIN_FAILURE_WINDOW', 300)
+        self.cache = caches[getattr(settings, 'AUTH_LOGIN_CACHE_ALIAS', 'default')]
+
+    def _keys(self, email, ip):
+        email = hashlib.sha256((email or '').strip().lower().encode()).hexdigest()
+        return f'login:failures:email:{email}', f'login:failures:ip:{ip}'
+
+    def blocked(self, email, ip):
+        """Seconds the client should wait before trying again, or 0 when it may try now."""
+        email_key, ip_key = self._keys(email, ip)
+        limits = {email_key: self.per_email, ip_key: self.per_ip}
+        values = self.cache.get_many([*limits, *(f'{key}:expires' for key in limits)])
+        now = time.time()
+        wait = 0
+        for key, limit in limits.items():
+            if values.get(key, 0) >= limit:
+                # What is left of the window, which started with the first failure
+                expires = values.get(f'{key}:expires', now + self.window)
+                wait = max(wait, math.ceil(expires - now), 1)
+        return wait
+
+    def failed(self, email, ip):
+        for key in self._keys(email, ip):
+            # add() starts the window, incr() is atomic on shared caches
+            if self.cache.add(key, 0, timeout=self.window):
+                self.cache.set(f'{key}:expires', time.time() + self.window, timeout=self.window)
+            try:
+                self.cache.incr(key)
+            except ValueError:  # expired between add() and incr()
+                self.cache.add(key, 1, timeout=self.window)
+                self.cache.set(f'{key}:expires', time.time() + self.window, timeout=self.window)
+
+    def succeeded(self, email):
+        self.cache.delete(self._keys(email, None)[0])
+
+
+def client_ip(request):
+    """
+    The client's address. Behind AUTH_TRUSTED_PROXY_COUNT reverse proxies
+    REMOTE_ADDR is the last proxy's, shared by every client, so the address
+    is read from X-Forwarded-For instead: the one the outermost trusted proxy
+    appended. Entries further left come from the client and can be forged.
+    """
+    proxies = getattr(settings, 'AUTH_TRUSTED_PROXY_COUNT', 0)
+    if proxies:
+        forwarded = [address.strip() for address in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')]
+        forwarded = [address for address in forwarded if address]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
@@ -5,7 +5,8 @@ from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
-from rest_framework_simplejwt.tokens import RefreshToken
+from .throttling import LoginAttemptLimiter, client_ip
+from .tokens import ClaimsRefreshToken
 from django.contrib.auth import authenticate
 from rest_framework.serializers import ModelSerializer
 from .models import CustomUser
@@ -34,6 +35,12 @@ def register_user(request):
     return Response({"message": "User registered successfully"}, status=status.HTTP_201_CREATED)
 
 
+def _too_many_attempts(retry_after):
+    response = Response({"error": "Too many login attempts. Try again later."}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
 # Login User (Obtain Token)
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -41,14 +48,22 @@ def login_user(request):
     email = request.data.get('email')
     password = request.data.get('password')
 
+    # Refuse floods of failed logins before paying for a password hash
+    limiter = LoginAttemptLimiter()
+    retry_after = limiter.blocked(email, client_ip(request))
+    if retry_after:
+        return _too_many_attempts(retry_after)
+
     user = authenticate(email=email, password=password)
     if user:
-        refresh = RefreshToken.for_user(user)
+        limiter.succeeded(email)
+        refresh = ClaimsRefreshToken.for_user(user)
         return Response({
             "refresh": str(refresh),
             "access": str(refresh.access_token),
         }, status=status.HTTP_200_OK)
-    
+
+    limiter.failed(email, client_ip(request))
     return Response({"error": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED)
 
 
@@ -57,7 +72,7 @@ def login_user(request):
 def logout_user(request):
     try:
         refresh_token = request.data.get("refresh")
-        token = RefreshToken(refresh_token)
+        token = ClaimsRefreshToken(refresh_token)
         token.blacklist()
         return Response({"message": "Successfully logged out"}, status=status.HTTP_200_OK)
     except Exception as e:
@@ -76,10 +91,15 @@ def get_user_details(request):
 def admin_login(request):
     email=request.data.get('email')
     password=request.data.get('password')
+    limiter = LoginAttemptLimiter()
+    retry_after = limiter.blocked(email, client_ip(request))
+    if retry_after:
+        return _too_many_attempts(retry_after)
     user=authenticate(email=email,password=password)
     if user:
+        limiter.succeeded(email)
         if user.is_superuser:
-            refresh = RefreshToken.for_user(user)
+            refresh = ClaimsRefreshToken.for_user(user)
             return Response({
                 "refresh": str(refresh),
                 "access": str(refresh.access_token),
@@ -92,6 +112,7 @@ def admin_login(request):
                     status=status.HTTP_401_UNAUTHORIZED
                 )
     else:
+        limiter.failed(email, client_ip(request))
         return Response({"message":"Invalid Credentials"},status=status.HTTP_401_UNAUTHORIZED)
 
  
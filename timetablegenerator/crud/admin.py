@@ -2,11 +2,12 @@ from django.contrib import admin
 
 # Register your models here.
 
-from .models import Timetable,Teachers,Subjects,Teacher_Subject
+from .models import Timetable,Teachers,Subjects,Teacher_Subject,GenerationJob
 @admin.register(Timetable)
 class TimetableAdmin(admin.ModelAdmin):
     list_display = ('day', 'time_slot', 'subject','semester','teacher','grade')
     list_filter = ('day',)
+    list_select_related = ('subject', 'teacher')
 
 
 @admin.register(Teachers)
@@ -20,3 +21,9 @@ class SubjectRegistration(admin.ModelAdmin):
 @admin.register(Teacher_Subject)
 class TeacherSubjectRegistration(admin.ModelAdmin):
     pass
+
+
+@admin.register(GenerationJob)
+class GenerationJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'slots_filled', 'slots_total', 'created_at', 'finished_at')
+    list_filter = ('status', 'kind')
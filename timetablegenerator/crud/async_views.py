@@ -0,0 +1,159 @@
+"""
+Async versions of the hot read endpoints, for ASGI deployments.
+
+timetablegenerator/asgi.py turns on TIMETABLE_ASYNC_READS, and crud/urls.py
+then routes these URLs here instead of to the DRF views:
+
+- GET get_timetable_by_semester/
+- GET get_structure/
+- GET teachers/ and GET subjects/ (plain lists)
+
+Each one answers with the same status and body as its DRF counterpart,
+and they share its cache. Cached timetable grids and cached user states
+are served without leaving the event loop. Queries go through Django's
+async ORM. Requests these views don't handle go to the DRF view in a
+thread: anything but GET and HEAD, and lists with ?page_size=, ?cursor=
+or ?expand=.
+
+Under WSGI the sync views stay in place, because every async view there
+would need its own event loop.
+"""
+import functools
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated, PermissionDenied
+from rest_framework.request import Request
+
+from api.authentication import ClaimsJWTAuthentication
+from .cache import aget_grid, astore_grid, make_entry
+from .filters import filter_by_params
+from .management.commands.generate_timetable import SEMESTER_DIVISIONS
+from .models import Subjects, Teachers
+from .rendering import acompact_grids, agrid_rows, dumps
+from .serializers import SubjectSerializer, TeachersSerializer
+from .views import (
+    GetTimetableBySemesterView,
+    SubjectViewSet,
+    TeacherViewSet,
+    _cached_json_response,
+    _not_found,
+    _parse_timetable_query,
+    _timetable_queryset,
+)
+
+authenticator = ClaimsJWTAuthentication()
+
+
+def _json(data, status=200):
+    # DRF's Response would render the same bytes
+    return HttpResponse(dumps(data), content_type='application/json', status=status)
+
+
+def _error_response(request, exc):
+    # What DRF's exception handler answers for an APIException
+    detail = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+    if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+        response = _json(detail, 401)
+        response['WWW-Authenticate'] = authenticator.authenticate_header(request)
+        return response
+    return _json(detail, exc.status_code)
+
+
+async def _check_access(request, admin=False):
+    """
+    Authenticate like DRF would for IsAuthenticated, or IsAdminUser when
+    ``admin``. Returns the error response, or None and sets request.user.
+    """
+    try:
+        authenticated = await authenticator.aauthenticate(request)
+        if authenticated is None:
+            raise NotAuthenticated()
+        request.user = authenticated[0]
+        if admin and not request.user.is_staff:
+            raise PermissionDenied()
+    except APIException as e:
+        return _error_response(request, e)
+    return None
+
+
+def _falls_back_to(drf_view, drf_params=()):
+    """
+    Hand requests other than GET and HEAD, or with any of ``drf_params``
+    in the query string, to ``drf_view`` in a thread.
+    """
+    drf_view = sync_to_async(drf_view)
+
+    def decorator(view):
+        # The DRF views are exempt too, JWT requests carry no CSRF token
+        @csrf_exempt
+        @functools.wraps(view)
+        async def wrapper(request):
+            if request.method not in ('GET', 'HEAD') or any(param in request.GET for param in drf_params):
+                return await drf_view(request)
+            return await view(request)
+        return wrapper
+    return decorator
+
+
+@_falls_back_to(GetTimetableBySemesterView.as_view())
+async def get_timetable_by_semester(request):
+    error = await _check_access(request)
+    if error is not None:
+        return error
+    try:
+        query = _parse_timetable_query(request.GET)
+    except ValueError as e:
+        return _json({"error": str(e)}, 400)
+
+    try:
+        # As GetTimetableBySemesterView, a current cached grid never leaves the event loop
+        version, entry = (None, None) if query.divisions else await aget_grid(query.semester, query.grade, query.layout)
+        if entry is None:
+            data = await (acompact_grids if query.layout == 'grid' else agrid_rows)(_timetable_queryset(query))
+            not_found = _not_found(query, data)
+            if not_found:
+                return _json(not_found, 404)
+            if query.divisions:
+                entry = make_entry(dumps(data))
+            else:
+                entry = await astore_grid(query.semester, query.grade, version, dumps(data), query.layout)
+
+        return _cached_json_response(request, entry)
+
+    except Exception as e:
+        return _json({"error": str(e)}, 400)
+
+
+async def get_structure(request):
+    return JsonResponse(SEMESTER_DIVISIONS, safe=False)
+
+
+_DRF_ONLY_PARAMS = ('page_size', 'cursor', 'expand')
+
+
+async def _model_list(request, queryset, viewset, serializer_class):
+    error = await _check_access(request, admin=True)
+    if error is not None:
+        return error
+    try:
+        queryset = filter_by_params(queryset, request.GET, viewset.filter_params)
+    except APIException as e:
+        return _error_response(request, e)
+
+    instances = [instance async for instance in queryset.aiterator(chunk_size=2000)]
+    # The serializers read ?fields= from a DRF request
+    serializer = serializer_class(instances, many=True, context={'request': Request(request)})
+    return _json(serializer.data)
+
+
+@_falls_back_to(TeacherViewSet.as_view({'get': 'list', 'post': 'create'}), _DRF_ONLY_PARAMS)
+async def teacher_list(request):
+    # Subject ids are part of every teacher, prefetched per chunk
+    return await _model_list(request, Teachers.objects.prefetch_related('subjects'), TeacherViewSet, TeachersSerializer)
+
+
+@_falls_back_to(SubjectViewSet.as_view({'get': 'list', 'post': 'create'}), _DRF_ONLY_PARAMS)
+async def subject_list(request):
+    return await _model_list(request, Subjects.objects.all(), SubjectViewSet, SubjectSerializer)
@@ -0,0 +1,256 @@
+import datetime
+import gc
+import platform
+import random
+import string
+import subprocess
+import time
+import tracemalloc
+
+import django
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from api.models import CustomUser
+from .management.commands.generate_timetable import generate_timetable
+from .models import Subjects, Teacher_Subject, Teachers, Timetable
+from .rendering import dumps, grid_rows
+from .serializers import TimetableSerializer
+from .solver import TimetableMatrix, load_problem, solve, solve_in_parallel
+
+# Single-character grade labels, enough for 52 divisions per semester
+DIVISION_LABELS = string.ascii_uppercase + string.ascii_lowercase
+
+
+def build_institution(teachers=50, semesters=range(3, 9), subjects_per_semester=8, divisions=2, departments=1,
+                      seed=0, batch_size=1000):
+    """
+    Fill the database with a synthetic institution and its empty timetable.
+
+    Every teacher is qualified for 3 to 6 random subjects, like the
+    generate_random_subject_teacher command. With several departments the
+    semesters and teachers are dealt out between them and teachers only
+    teach subjects of their own department. Returns the semester to
+    divisions mapping that was generated.
+    """
+    if divisions > len(DIVISION_LABELS):
+        raise ValueError(f"At most {len(DIVISION_LABELS)} divisions per semester are supported")
+    rng = random.Random(seed)
+    semesters = list(semesters)
+    department_of_semester = {semester: index % departments for index, semester in enumerate(semesters)}
+
+    with transaction.atomic():
+        Teachers.objects.bulk_create(
+            [
+                Teachers(name=f"Teacher {index}", phone_number=f"{index:010d}", department=f"DEPT {index % departments}")
+                for index in range(teachers)
+            ],
+            batch_size=batch_size,
+        )
+        Subjects.objects.bulk_create(
+            [
+                Subjects(semester=semester, name=f"Subject {semester}-{index}", subject_code=f"S{semester}-{index}")
+                for semester in semesters
+                for index in range(subjects_per_semester)
+            ],
+            batch_size=batch_size,
+        )
+        subject_ids = {department: [] for department in range(departments)}
+        for subject_id, semester in Subjects.objects.values_list('id', 'semester'):
+            subject_ids[department_of_semester[semester]].append(subject_id)
+        today = datetime.date.today()
+        assignments = []
+        for teacher_id, department in Teachers.objects.values_list('id', 'department'):
+            own = subject_ids[int(department.split()[-1])]
+            assignments.extend(
+                Teacher_Subject(teacher_id=teacher_id, subject_id=subject_id, assigned_date=today)
+                for subject_id in rng.sample(own, min(len(own), rng.randint(3, 6)))
+            )
+        Teacher_Subject.objects.bulk_create(assignments, batch_size=batch_size)
+
+    layout = {semester: list(DIVISION_LABELS[:divisions]) for semester in semesters}
+    generate_timetable(layout, batch_size=batch_size)
+    return layout
+
+
+def clear_institution():
+    with transaction.atomic():
+        Timetable.objects.all().delete()
+        Teacher_Subject.objects.all().delete()
+        Teachers.objects.all().delete()
+        Subjects.objects.all().delete()
+    caches['default'].clear()
+
+
+def measure(func, trace_memory=True):
+    """Run func once and return its wall time, query count and peak traced memory."""
+    gc.collect()
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            func()
+            wall_time = time.perf_counter() - started
+        peak_memory = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    return {
+        "wall_time": round(wall_time, 6),
+        "queries": len(queries.captured_queries),
+        "peak_memory": peak_memory,
+    }
+
+
+def serializer_cases(semester, grade, repeat=50, trace_memory=True):
+    """
+    Time rendering one division's grid ``repeat`` times through
+    TimetableSerializer and JSONRenderer, as the read view used to, and
+    through the values_list() rows and encoder it uses now.
+    """
+    entries = Timetable.objects.filter(semester=semester, grade=grade)
+
+    def drf():
+        for _ in range(repeat):
+            rows = entries.with_related().in_week_order()
+            JSONRenderer().render(TimetableSerializer(rows, many=True).data)
+
+    def fast():
+        for _ in range(repeat):
+            dumps(grid_rows(entries.in_week_order()))
+
+    results = {"serialize_drf": measure(drf, trace_memory), "serialize_fast": measure(fast, trace_memory)}
+    for metrics in results.values():
+        metrics["repeat"] = repeat
+    return results
+
+
+def _week_slots(semester, grade):
+    return [
+        {"semester": semester, "grade": grade, "day": day, "time_slot": time_slot}
+        for day, _ in Timetable.DAY_CHOICES
+        for time_slot, _ in Timetable.TIME_SLOTS
+    ]
+
+
+def run_cases(layout, trace_memory=True):
+    """Time the solver and the hot endpoints against the institution currently in the database."""
+    client = APIClient()
+    admin = CustomUser.objects.filter(email="benchmark@example.com").first()
+    if admin is None:
+        admin = CustomUser.objects.create_superuser(email="benchmark@example.com", password="benchmark")
+    client.force_authenticate(admin)
+
+    divisions = [(semester, grade) for semester, grades in layout.items() for grade in grades]
+    first_semester, first_grade = divisions[0]
+    results = {}
+
+    def check(response):
+        if response.status_code >= 400:
+            raise RuntimeError(f"{response.request['PATH_INFO']} returned {response.status_code}")
+        return response
+
+    # build_institution() already made the grid; without deleting it this would time no-op inserts
+    Timetable.objects.all().delete()
+    results["generate_timetable"] = measure(lambda: generate_timetable(layout), trace_memory)
+    results["solve"] = measure(lambda: solve(load_problem()), trace_memory)
+    results["solve_parallel"] = measure(lambda: solve_in_parallel(load_problem(), min_cells=0), trace_memory)
+    results["populate"] = measure(lambda: check(client.post('/api/populate-timetable/')), trace_memory)
+
+    def analyse():
+        matrix = TimetableMatrix.from_database()
+        matrix.teacher_clashes()
+        matrix.teacher_load()
+        matrix.subject_hours()
+
+    results["matrix_analytics"] = measure(analyse, trace_memory)
+
+    def read_all():
+        for semester, grade in divisions:
+            check(client.get('/api/get_timetable_by_semester/', {'semester': semester, 'grade': grade}))
+
+    results.update(serializer_cases(first_semester, first_grade, trace_memory=trace_memory))
+
+    caches['default'].clear()
+    results["read_cold"] = measure(read_all, trace_memory)
+    results["read_warm"] = measure(read_all, trace_memory)
+
+    week = _week_slots(first_semester, first_grade)
+    clear_week = [dict(slot, action="clear") for slot in week]
+    results["bulk_edit"] = measure(
+        lambda: check(client.patch('/api/timetable/bulk/', clear_week, format='json')), trace_memory
+    )
+    results["repair"] = measure(
+        lambda: check(client.post('/api/repair-timetable/', {"slots": week}, format='json')), trace_memory
+    )
+
+    for name in ("read_cold", "read_warm"):
+        results[name]["requests"] = len(divisions)
+    for name in ("bulk_edit", "repair"):
+        results[name]["slots"] = len(week)
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(sizes, semesters=range(3, 9), subjects_per_semester=8, departments=1, seed=0, trace_memory=True,
+                  progress=None):
+    """
+    Benchmark every (teachers, divisions) pair in ``sizes`` on a fresh
+    synthetic institution and return a JSON-serialisable report.
+    """
+    report = {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": connection.vendor,
+        "seed": seed,
+        "runs": [],
+    }
+    for teachers, divisions in sizes:
+        if progress:
+            progress(f"{teachers} teachers, {divisions} divisions per semester")
+        clear_institution()
+        layout = build_institution(
+            teachers=teachers, semesters=semesters, subjects_per_semester=subjects_per_semester,
+            divisions=divisions, departments=departments, seed=seed,
+        )
+        report["runs"].append({
+            "teachers": teachers,
+            "divisions_per_semester": divisions,
+            "semesters": list(semesters),
+            "subjects_per_semester": subjects_per_semester,
+            "departments": departments,
+            "slots": Timetable.objects.count(),
+            "results": run_cases(layout, trace_memory),
+        })
+    clear_institution()
+    return report
+
+
+def compare_reports(old, new):
+    """Yield (size, case, metric, old value, new value) for every metric present in both reports."""
+    old_runs = {(run["teachers"], run["divisions_per_semester"]): run for run in old.get("runs", [])}
+    for run in new.get("runs", []):
+        size = (run["teachers"], run["divisions_per_semester"])
+        if size not in old_runs:
+            continue
+        for case, metrics in run["results"].items():
+            before = old_runs[size]["results"].get(case)
+            if before is None:
+                continue
+            for metric in ("wall_time", "queries", "peak_memory"):
+                if before.get(metric) is not None and metrics.get(metric) is not None:
+                    yield size, case, metric, before[metric], metrics[metric]
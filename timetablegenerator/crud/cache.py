@@ -0,0 +1,98 @@
+import hashlib
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+# Changing this token invalidates every cached grid at once
+GENERATION_KEY = 'timetable:generation'
+
+
+def _cache():
+    return caches[getattr(settings, 'TIMETABLE_CACHE_ALIAS', 'default')]
+
+
+def _version_key(semester, grade):
+    return f'timetable:version:{semester}:{grade}'
+
+
+def _grid_key(semester, grade, variant):
+    return f'timetable:grid:{variant}:{semester}:{grade}'
+
+
+def _new_token():
+    # Tokens are never reused, so an evicted version key can't revive an old grid
+    return uuid.uuid4().hex
+
+
+def get_grid(semester, grade, variant='list'):
+    """
+    Look up the rendered grid of one division in a single cache round trip.
+
+    Returns ``(version, entry)``. ``entry`` is a dict with ``etag`` and
+    ``body`` when the cached grid is still current, otherwise None. Pass
+    ``version`` to store_grid() after rebuilding the grid, so a grid built
+    while a write was going on is never stored as current.
+    """
+    cache = _cache()
+    version_key = _version_key(semester, grade)
+    grid_key = _grid_key(semester, grade, variant)
+    found = cache.get_many([GENERATION_KEY, version_key, grid_key])
+
+    for key in (GENERATION_KEY, version_key):
+        if key not in found:
+            cache.add(key, _new_token(), timeout=None)
+            found[key] = cache.get(key)
+    version = (found[GENERATION_KEY], found[version_key])
+
+    entry = found.get(grid_key)
+    if entry is not None and entry['version'] == version:
+        return version, entry
+    return version, None
+
+
+def make_entry(body, version=None):
+    """A rendered body with its ETag, in the form get_grid() returns."""
+    return {
+        'version': version,
+        'etag': f'"{hashlib.md5(body).hexdigest()}"',
+        'body': body,
+    }
+
+
+def store_grid(semester, grade, version, body, variant='list'):
+    entry = make_entry(body, version)
+    timeout = getattr(settings, 'TIMETABLE_CACHE_TIMEOUT', 60 * 60 * 24)
+    _cache().set(_grid_key(semester, grade, variant), entry, timeout=timeout)
+    return entry
+
+
+def _in_process():
+    # These never wait on I/O, so async views may call them on the event loop
+    return isinstance(_cache(), (LocMemCache, DummyCache))
+
+
+async def aget_grid(semester, grade, variant='list'):
+    """get_grid() for async views. Shared caches are read in a worker thread."""
+    if _in_process():
+        return get_grid(semester, grade, variant)
+    return await sync_to_async(get_grid, thread_sensitive=False)(semester, grade, variant)
+
+
+async def astore_grid(semester, grade, version, body, variant='list'):
+    if _in_process():
+        return store_grid(semester, grade, version, body, variant)
+    return await sync_to_async(store_grid, thread_sensitive=False)(semester, grade, version, body, variant)
+
+
+def invalidate(semester, grade):
+    """Drop the cached grids of one division."""
+    _cache().set(_version_key(semester, grade), _new_token(), timeout=None)
+
+
+def invalidate_all():
+    """Drop every cached grid, for writes that touch more than one division."""
+    _cache().set(GENERATION_KEY, _new_token(), timeout=None)
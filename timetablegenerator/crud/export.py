@@ -0,0 +1,122 @@
+import csv
+import datetime
+
+from django.conf import settings
+
+from .models import Timetable
+
+EXPORT_FIELDS = (
+    'id', 'semester', 'grade', 'day', 'time_slot', 'day_number', 'slot_number',
+    'subject__subject_code', 'subject__name', 'teacher_id', 'teacher__name',
+)
+
+CSV_HEADER = ['semester', 'grade', 'day', 'time_slot', 'subject_code', 'subject', 'teacher']
+
+
+def export_rows(semester=None, grade=None, teacher=None, chunk_size=None):
+    """
+    Every Timetable slot, or those of one division or teacher, ordered by
+    division and week. Rows are named tuples read in chunks from a
+    server-side cursor, so memory doesn't grow with the number of divisions.
+    """
+    if chunk_size is None:
+        chunk_size = getattr(settings, 'TIMETABLE_EXPORT_CHUNK_SIZE', 2000)
+    rows = Timetable.objects.all()
+    if semester is not None:
+        rows = rows.filter(semester=semester)
+    if grade is not None:
+        rows = rows.filter(grade=grade)
+    if teacher is not None:
+        rows = rows.filter(teacher_id=teacher)
+    rows = rows.order_by('semester', 'grade', 'day_number', 'slot_number')
+    return rows.values_list(*EXPORT_FIELDS, named=True).iterator(chunk_size=chunk_size)
+
+
+class _Echo:
+    # csv.writer only needs write(), which here hands the formatted line straight back
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_HEADER)
+    for row in rows:
+        yield writer.writerow([
+            row.semester, row.grade, row.day, row.time_slot,
+            row.subject__subject_code or '', row.subject__name or '', row.teacher__name or '',
+        ])
+
+
+def _ics_text(value):
+    return value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+
+def _ics_line(line):
+    # Lines longer than 75 octets are folded onto continuation lines starting with a space
+    encoded = line.encode()
+    parts = []
+    while len(encoded) > 75:
+        cut = 75 if not parts else 74
+        while encoded[cut] & 0xC0 == 0x80:  # don't split a UTF-8 character
+            cut -= 1
+        parts.append(encoded[:cut].decode())
+        encoded = encoded[cut:]
+    parts.append(encoded.decode())
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def _clock(label):
+    # Slot labels use a 12-hour clock without am/pm, so afternoon hours are below 8
+    hours, minutes = (int(part) for part in label.split(':'))
+    return datetime.time(hours + 12 if hours < 8 else hours, minutes)
+
+
+def week_start(today=None):
+    """Monday of the current week, where weekly .ics events start."""
+    today = today or datetime.date.today()
+    return today - datetime.timedelta(days=today.weekday())
+
+
+def iter_ics(rows, name, start=None):
+    """
+    An iCalendar feed with one weekly event per taught slot. Times are
+    floating local times, so calendar apps show them in their own zone.
+    """
+    start = start or week_start()
+    stamp = datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    yield ''.join(_ics_line(line) for line in [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//timetablegenerator//timetable export//EN',
+        'CALSCALE:GREGORIAN',
+        f'X-WR-CALNAME:{_ics_text(name)}',
+    ])
+    for row in rows:
+        if row.subject__name is None and row.teacher__name is None:
+            continue
+        if row.day_number is None or row.slot_number is None:
+            continue
+        date = start + datetime.timedelta(days=row.day_number)
+        begins, ends = (_clock(label) for label in row.time_slot.split('-'))
+        summary = row.subject__name or 'Unassigned subject'
+        description = f"Semester {row.semester}, Grade {row.grade}, {row.teacher__name or 'no teacher'}"
+        yield ''.join(_ics_line(line) for line in [
+            'BEGIN:VEVENT',
+            f'UID:timetable-{row.id}@timetablegenerator',
+            f'DTSTAMP:{stamp}',
+            f'DTSTART:{datetime.datetime.combine(date, begins):%Y%m%dT%H%M%S}',
+            f'DTEND:{datetime.datetime.combine(date, ends):%Y%m%dT%H%M%S}',
+            'RRULE:FREQ=WEEKLY',
+            f'SUMMARY:{_ics_text(summary)}',
+            f'DESCRIPTION:{_ics_text(description)}',
+            f'LOCATION:{_ics_text(f"Semester {row.semester} {row.grade}")}',
+            'END:VEVENT',
+        ])
+    yield _ics_line('END:VCALENDAR')
+
+
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ics': 'text/calendar; charset=utf-8',
+}
@@ -0,0 +1,35 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework.exceptions import ValidationError
+
+
+def filter_by_params(queryset, params, lookups):
+    """
+    Narrow ``queryset`` by the query parameters named in ``lookups``, which
+    maps a parameter to the ORM lookup it filters on. Empty parameters are
+    ignored and values of the wrong type are a 400.
+    """
+    for param, lookup in lookups.items():
+        value = params.get(param)
+        if value in (None, ''):
+            continue
+        try:
+            queryset = queryset.filter(**{lookup: value})
+        except (ValueError, DjangoValidationError):
+            raise ValidationError({param: f"Invalid value '{value}'."})
+    return queryset
+
+
+def expanded(request, name):
+    """Whether ?expand= lists ``name``, e.g. ?expand=subjects."""
+    if request is None:
+        return False
+    return name in request.query_params.get('expand', '').split(',')
+
+
+class QueryParamFilterMixin:
+    """ViewSet mixin applying ``filter_params`` (parameter -> lookup) to every query."""
+    filter_params = {}
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        return filter_by_params(queryset, self.request.query_params, self.filter_params)
@@ -0,0 +1,235 @@
+import codecs
+import csv
+import datetime
+import itertools
+import json
+
+from django.db import transaction
+
+from .cache import invalidate_all
+from .models import Subjects, Teacher_Subject, Teachers
+
+KINDS = ('teachers', 'subjects', 'qualifications')
+
+# Errors beyond this many are counted but not listed in the report
+MAX_REPORTED_ERRORS = 100
+
+
+def read_rows(lines, name):
+    """
+    Yield one dict per record of a .csv, .jsonl or .json file given as an
+    iterable of byte lines. CSV and JSON Lines are read line by line; a
+    .json file holds one array and is parsed whole.
+    """
+    extension = name.rsplit('.', 1)[-1].lower()
+    lines = codecs.iterdecode(lines, 'utf-8-sig')
+    if extension == 'csv':
+        yield from csv.DictReader(lines)
+    elif extension in ('jsonl', 'ndjson'):
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+    elif extension == 'json':
+        records = json.loads(''.join(lines))
+        if not isinstance(records, list):
+            raise ValueError("A .json import must hold an array of records")
+        yield from records
+    else:
+        raise ValueError("Import files must be .csv, .jsonl or .json")
+
+
+class RowError(Exception):
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def _text(record, model, field, errors, required=True):
+    value = record.get(field)
+    value = '' if value is None else str(value).strip()
+    if not value:
+        if required:
+            errors[field] = "This field is required."
+        return None
+    max_length = model._meta.get_field(field).max_length
+    if max_length and len(value) > max_length:
+        errors[field] = f"At most {max_length} characters."
+    return value
+
+
+def _integer(record, field, errors, required=True):
+    value = record.get(field)
+    if value in (None, ''):
+        if required:
+            errors[field] = "This field is required."
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        errors[field] = "Must be an integer."
+        return None
+
+
+class Importer:
+    """
+    Validate and upsert records of one kind in batches inside one transaction.
+
+    Teachers are matched on phone_number and subjects on subject_code, the
+    natural keys a spreadsheet carries. The existing keys are read into
+    dicts once, so each batch costs an INSERT for new rows and an UPDATE
+    for changed ones. Qualifications reference teachers by ``teacher``
+    (phone number) or ``teacher_id`` and subjects by ``subject`` (code) or
+    ``subject_id``, and are upserted on their (teacher, subject) key.
+    Invalid rows are skipped and reported with their row number.
+    """
+
+    def __init__(self, kind, batch_size=1000):
+        if kind not in KINDS:
+            raise ValueError(f"Unknown import kind '{kind}', expected one of {', '.join(KINDS)}")
+        self.kind = kind
+        self.batch_size = batch_size
+        self.report = {"kind": kind, "rows": 0, "created": 0, "updated": 0, "skipped": 0, "errors": []}
+
+    def run(self, records):
+        with transaction.atomic():
+            self._load_keys()
+            numbered = enumerate(records, start=1)
+            while True:
+                batch = list(itertools.islice(numbered, self.batch_size))
+                if not batch:
+                    break
+                self._import_batch(batch)
+        if self.report["created"] or self.report["updated"]:
+            invalidate_all()
+        return self.report
+
+    def _load_keys(self):
+        if self.kind == 'teachers':
+            rows = Teachers.objects.values_list('id', 'phone_number', 'name', 'department')
+            self.existing = {phone: (pk, name, department) for pk, phone, name, department in rows}
+        elif self.kind == 'subjects':
+            rows = Subjects.objects.values_list('id', 'subject_code', 'name', 'semester')
+            self.existing = {code: (pk, name, semester) for pk, code, name, semester in rows}
+        else:
+            self.teacher_ids = dict(Teachers.objects.values_list('phone_number', 'id'))
+            self.subject_ids = dict(Subjects.objects.values_list('subject_code', 'id'))
+            self.known_teachers = set(self.teacher_ids.values())
+            self.known_subjects = set(self.subject_ids.values())
+            self.existing = set(Teacher_Subject.objects.values_list('teacher_id', 'subject_id'))
+
+    def _import_batch(self, batch):
+        clean = {}
+        for number, record in batch:
+            self.report["rows"] += 1
+            try:
+                if not isinstance(record, dict):
+                    raise RowError({"row": "Must be an object."})
+                key, values = getattr(self, f'_clean_{self.kind}')(record)
+            except RowError as e:
+                self.report["skipped"] += 1
+                if len(self.report["errors"]) < MAX_REPORTED_ERRORS:
+                    self.report["errors"].append({"row": number, "errors": e.errors})
+                continue
+            # A key repeated within the file keeps its last row
+            clean[key] = values
+        getattr(self, f'_save_{self.kind}')(clean)
+
+    def _clean_teachers(self, record):
+        errors = {}
+        phone = _text(record, Teachers, 'phone_number', errors)
+        values = {
+            "name": _text(record, Teachers, 'name', errors),
+            "department": _text(record, Teachers, 'department', errors, required=False),
+        }
+        if errors:
+            raise RowError(errors)
+        return phone, values
+
+    def _clean_subjects(self, record):
+        errors = {}
+        code = _text(record, Subjects, 'subject_code', errors)
+        values = {
+            "name": _text(record, Subjects, 'name', errors),
+            "semester": _integer(record, 'semester', errors),
+        }
+        if errors:
+            raise RowError(errors)
+        return code, values
+
+    def _reference(self, record, field, by_key, known, errors):
+        if record.get(f'{field}_id') not in (None, ''):
+            pk = _integer(record, f'{field}_id', errors)
+            if pk is not None and pk not in known:
+                errors[f'{field}_id'] = f"No {field} with id {pk}."
+            return pk
+        key = record.get(field)
+        key = '' if key is None else str(key).strip()
+        if not key:
+            errors[field] = f"Give the {field}'s {'phone number' if field == 'teacher' else 'code'} or {field}_id."
+            return None
+        if key not in by_key:
+            errors[field] = f"Unknown {field} '{key}'."
+        return by_key.get(key)
+
+    def _clean_qualifications(self, record):
+        errors = {}
+        teacher_id = self._reference(record, 'teacher', self.teacher_ids, self.known_teachers, errors)
+        subject_id = self._reference(record, 'subject', self.subject_ids, self.known_subjects, errors)
+        assigned = record.get('assigned_date') or None
+        if assigned is not None:
+            try:
+                assigned = datetime.date.fromisoformat(str(assigned).strip())
+            except ValueError:
+                errors['assigned_date'] = "Must be a YYYY-MM-DD date."
+        if errors:
+            raise RowError(errors)
+        return (teacher_id, subject_id), {"assigned_date": assigned or datetime.date.today()}
+
+    def _save_teachers(self, clean):
+        new, changed = [], []
+        for phone, values in clean.items():
+            values["department"] = values["department"] or Teachers._meta.get_field('department').default
+            if phone not in self.existing:
+                new.append(Teachers(phone_number=phone, **values))
+            elif self.existing[phone][1:] != (values["name"], values["department"]):
+                changed.append(Teachers(id=self.existing[phone][0], phone_number=phone, **values))
+        Teachers.objects.bulk_create(new)
+        Teachers.objects.bulk_update(changed, fields=['name', 'department'])
+        for teacher in new + changed:
+            self.existing[teacher.phone_number] = (teacher.pk, teacher.name, teacher.department)
+        self.report["created"] += len(new)
+        self.report["updated"] += len(changed)
+
+    def _save_subjects(self, clean):
+        new, changed = [], []
+        for code, values in clean.items():
+            if code not in self.existing:
+                new.append(Subjects(subject_code=code, **values))
+            elif self.existing[code][1:] != (values["name"], values["semester"]):
+                changed.append(Subjects(id=self.existing[code][0], subject_code=code, **values))
+        Subjects.objects.bulk_create(new)
+        Subjects.objects.bulk_update(changed, fields=['name', 'semester'])
+        for subject in new + changed:
+            self.existing[subject.subject_code] = (subject.pk, subject.name, subject.semester)
+        self.report["created"] += len(new)
+        self.report["updated"] += len(changed)
+
+    def _save_qualifications(self, clean):
+        Teacher_Subject.objects.bulk_create(
+            [
+                Teacher_Subject(teacher_id=teacher_id, subject_id=subject_id, **values)
+                for (teacher_id, subject_id), values in clean.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['teacher', 'subject'],
+            update_fields=['assigned_date'],
+        )
+        created = clean.keys() - self.existing
+        self.existing |= created
+        self.report["created"] += len(created)
+        self.report["updated"] += len(clean) - len(created)
+
+
+def import_records(kind, records, batch_size=1000):
+    """Import an iterable of record dicts of one kind and return the report."""
+    return Importer(kind, batch_size).run(records)
@@ -0,0 +1,148 @@
+import datetime
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.db.models import F
+from django.utils import timezone
+
+from .models import GenerationJob
+from .operations import clear_timetable, populate_timetable, repair_timetable
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_job(kind, payload=None):
+    return GenerationJob.objects.create(kind=kind, payload=payload or {})
+
+
+def requeue_stale_jobs():
+    """
+    Take back running jobs whose worker stopped sending heartbeats, e.g.
+    because it crashed: they are queued again, or failed once they have been
+    tried TIMETABLE_JOB_MAX_ATTEMPTS times. Returns how many were taken back.
+    """
+    stale_after = getattr(settings, 'TIMETABLE_JOB_STALE_AFTER', 120)
+    max_attempts = getattr(settings, 'TIMETABLE_JOB_MAX_ATTEMPTS', 3)
+    now = timezone.now()
+    stale = GenerationJob.objects.filter(
+        status='running', heartbeat_at__lt=now - datetime.timedelta(seconds=stale_after)
+    )
+    failed = stale.filter(attempts__gte=max_attempts).update(
+        status='failed', error="The worker running this job stopped responding.", finished_at=now
+    )
+    requeued = stale.filter(attempts__lt=max_attempts).update(status='queued', started_at=None, heartbeat_at=None)
+    if failed or requeued:
+        logger.warning(f"Took back {requeued + failed} stale generation jobs, {failed} of them failed")
+    return requeued + failed
+
+
+def claim_next_job():
+    """
+    Take the oldest queued job and mark it running. The status check is part
+    of the UPDATE, so two workers can never claim the same job.
+    """
+    requeue_stale_jobs()
+    while True:
+        job = GenerationJob.objects.filter(status='queued').order_by('created_at', 'pk').first()
+        if job is None:
+            return None
+        now = timezone.now()
+        claimed = GenerationJob.objects.filter(pk=job.pk, status='queued').update(
+            status='running', started_at=now, heartbeat_at=now, attempts=F('attempts') + 1
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+class _Heartbeat(threading.Thread):
+    """Stamp heartbeat_at on a running job every ``interval`` seconds until stopped."""
+
+    def __init__(self, job, interval):
+        super().__init__(name=f"generation-job-{job.pk}-heartbeat", daemon=True)
+        self.job = job
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        beaten = False
+        try:
+            while not self.stopped.wait(self.interval):
+                beaten = True
+                try:
+                    GenerationJob.objects.filter(pk=self.job.pk, status='running').update(heartbeat_at=timezone.now())
+                except DatabaseError as e:
+                    logger.warning(f"Heartbeat of generation job {self.job.pk} failed: {str(e)}")
+        finally:
+            # The thread's own connection
+            if beaten:
+                connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+class _ProgressWriter:
+    """Save solver progress on the job row, at most every ``interval`` seconds."""
+
+    def __init__(self, job, interval=0.5):
+        self.job = job
+        self.interval = interval
+        self.last_write = 0.0
+
+    def __call__(self, filled, total):
+        now = time.monotonic()
+        if filled and filled < total and now - self.last_write < self.interval:
+            return
+        self.last_write = now
+        GenerationJob.objects.filter(pk=self.job.pk).update(slots_filled=filled, slots_total=total)
+
+
+def run_job(job):
+    progress = _ProgressWriter(job)
+    heartbeat = _Heartbeat(job, getattr(settings, 'TIMETABLE_JOB_HEARTBEAT_INTERVAL', 10))
+    heartbeat.start()
+    try:
+        if job.kind == 'populate':
+            updated, solution = populate_timetable(progress=progress)
+        elif job.kind == 'repair':
+            dirty = [tuple(slot) for slot in job.payload.get('slots', [])]
+            avoid = {tuple(entry['slot']): set(entry['teacher_ids']) for entry in job.payload.get('avoid', [])}
+            updated, solution = repair_timetable(dirty, avoid, progress=progress)
+        elif job.kind == 'clear':
+            updated, solution = clear_timetable(), None
+        else:
+            raise ValueError(f"Unknown job kind '{job.kind}'")
+    except Exception as e:
+        logger.error(f"Generation job {job.pk} failed: {str(e)}")
+        GenerationJob.objects.filter(pk=job.pk).update(status='failed', error=str(e), finished_at=timezone.now())
+        return
+    finally:
+        heartbeat.stop()
+
+    fields = {'status': 'done', 'updated': updated, 'finished_at': timezone.now()}
+    if solution is not None:
+        fields.update(slots_filled=solution.filled, conflicts=solution.unsatisfied)
+    GenerationJob.objects.filter(pk=job.pk).update(**fields)
+    logger.info(f"Generation job {job.pk} finished, {updated} rows changed")
+
+
+def run_worker(poll_interval=1.0, once=False):
+    """Run queued jobs one after another. With ``once`` it stops when the queue is empty."""
+    while True:
+        job = claim_next_job()
+        if job is not None:
+            run_job(job)
+            continue
+        if once:
+            return
+        time.sleep(poll_interval)
+
+
+def shares_cache_with_web_server():
+    backend = settings.CACHES[getattr(settings, 'TIMETABLE_CACHE_ALIAS', 'default')]['BACKEND']
+    return not backend.endswith(('LocMemCache', 'DummyCache'))
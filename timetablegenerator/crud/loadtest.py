@@ -0,0 +1,188 @@
+"""
+Load a running deployment, or several, to compare them under concurrency.
+
+For the sync views under WSGI against the async ones under ASGI, start both
+on one database holding a generated timetable, e.g.
+
+    gunicorn timetablegenerator.wsgi --workers 4 --threads 8 --bind 127.0.0.1:8000
+    uvicorn timetablegenerator.asgi:application --workers 4 --port 8001
+
+and run
+
+    manage.py load_test --target wsgi=http://127.0.0.1:8000 --target asgi=http://127.0.0.1:8001 \\
+        --email admin@example.com --password ... --concurrency 200
+
+The client is plain asyncio with keep-alive connections, so it can hold
+hundreds open from one process.
+"""
+import asyncio
+import json
+import math
+import ssl
+import time
+import urllib.request
+from urllib.parse import urlsplit
+
+# The hot read endpoints, served by crud/async_views.py under ASGI
+DEFAULT_PATHS = (
+    '/api/get_timetable_by_semester/?semester=3&grade=A',
+    '/api/get_structure/',
+    '/api/teachers/',
+    '/api/subjects/',
+)
+
+
+def percentile(values, fraction):
+    """The nearest-rank percentile of ``values``, e.g. fraction=0.99 for p99."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def login(base_url, email, password):
+    """An access token from the deployment's admin login."""
+    request = urllib.request.Request(
+        base_url.rstrip('/') + '/api/admin/login/',
+        data=json.dumps({'email': email, 'password': password}).encode(),
+        headers={'Content-Type': 'application/json'},
+    )
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.load(response)['access']
+
+
+class _Connection:
+    """One keep-alive HTTP/1.1 connection, reopened when the server closes it."""
+
+    def __init__(self, url):
+        self.host = url.hostname
+        self.port = url.port or (443 if url.scheme == 'https' else 80)
+        self.ssl = ssl.create_default_context() if url.scheme == 'https' else None
+        self.host_header = url.netloc
+        self.reader = self.writer = None
+
+    async def _open(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port, ssl=self.ssl)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+    async def get(self, target, headers):
+        if self.writer is None:
+            await self._open()
+        lines = [f"GET {target} HTTP/1.1", f"Host: {self.host_header}", "Connection: keep-alive"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1'))
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("Connection closed by the server")
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+
+        if response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = bytearray()
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    await self.reader.readline()
+                    break
+                body += await self.reader.readexactly(size)
+                await self.reader.readline()
+        elif 'content-length' in response_headers:
+            body = await self.reader.readexactly(int(response_headers['content-length']))
+        elif status in (204, 304):
+            body = b''
+        else:
+            body = await self.reader.read()
+            self.close()
+
+        if response_headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status, bytes(body)
+
+
+async def run_load(base_url, path, requests=1000, concurrency=100, headers=None, timeout=30):
+    """
+    GET ``path`` ``requests`` times from ``concurrency`` keep-alive
+    connections at once and return throughput and latency figures.
+    Responses other than 2xx and 304, timeouts and connection errors are
+    counted as errors and left out of the latencies.
+    """
+    url = urlsplit(base_url.rstrip('/') + path)
+    target = url.path + (f"?{url.query}" if url.query else '')
+    headers = headers or {}
+    latencies = []
+    errors = {}
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining
+        connection = _Connection(url)
+        try:
+            while remaining > 0:
+                remaining -= 1
+                started = time.perf_counter()
+                try:
+                    status, _ = await asyncio.wait_for(connection.get(target, headers), timeout)
+                except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, IndexError) as e:
+                    connection.close()
+                    errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+                    continue
+                if 200 <= status < 300 or status == 304:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors[str(status)] = errors.get(str(status), 0) + 1
+        finally:
+            connection.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, requests))))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "path": path,
+        "requests": requests,
+        "concurrency": concurrency,
+        "ok": len(latencies),
+        "errors": errors,
+        "elapsed": elapsed,
+        "requests_per_second": len(latencies) / elapsed if elapsed else None,
+        "p50": percentile(latencies, 0.50),
+        "p90": percentile(latencies, 0.90),
+        "p99": percentile(latencies, 0.99),
+        "max": max(latencies, default=None),
+    }
+
+
+def run_load_test(targets, paths=DEFAULT_PATHS, requests=1000, concurrency=100, warmup=50, tokens=None, timeout=30,
+                  progress=None):
+    """
+    Load every path of every target, e.g. ``{"wsgi": "http://127.0.0.1:8000",
+    "asgi": "http://127.0.0.1:8001"}``, one after the other so they don't
+    compete for the machine. ``tokens`` maps a target to the access token
+    its requests carry. Each path is warmed up first, so the figures are
+    for the deployment's cached state.
+    """
+    report = {"requests": requests, "concurrency": concurrency, "targets": {}}
+    for name, base_url in targets.items():
+        token = (tokens or {}).get(name)
+        headers = {'Authorization': f"Bearer {token}"} if token else {}
+        results = []
+        for path in paths:
+            if progress:
+                progress(f"{name}: {path}")
+            if warmup:
+                asyncio.run(run_load(base_url, path, warmup, min(concurrency, warmup), headers, timeout))
+            results.append(asyncio.run(run_load(base_url, path, requests, concurrency, headers, timeout)))
+        report["targets"][name] = {"url": base_url, "results": results}
+    return report
@@ -0,0 +1,71 @@
+import itertools
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from crud.benchmark import compare_reports, run_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark timetable generation, population, reads and bulk edits on synthetic institutions. "
+        "Runs against a throwaway test database, never the configured one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--teachers', type=int, nargs='+', default=[50],
+                            help='Teacher counts to try, e.g. 50 500 5000')
+        parser.add_argument('--divisions', type=int, nargs='+', default=[2],
+                            help='Divisions per semester to try, e.g. 2 10 50')
+        parser.add_argument('--semesters', type=int, nargs='+', default=list(range(3, 9)))
+        parser.add_argument('--subjects-per-semester', type=int, default=8)
+        parser.add_argument('--departments', type=int, default=1,
+                            help='Split semesters and teachers into this many independent departments')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--no-memory', action='store_true',
+                            help='Skip tracemalloc so wall times are not slowed down by tracing')
+        parser.add_argument('--output', help='Write the JSON report to this file')
+        parser.add_argument('--compare', help='Earlier JSON report to compare against')
+
+    def handle(self, *args, **options):
+        sizes = list(itertools.product(options['teachers'], options['divisions']))
+
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            report = run_benchmark(
+                sizes,
+                semesters=options['semesters'],
+                subjects_per_semester=options['subjects_per_semester'],
+                departments=options['departments'],
+                seed=options['seed'],
+                trace_memory=not options['no_memory'],
+                progress=lambda message: self.stdout.write(f"Benchmarking {message}"),
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        for run in report["runs"]:
+            self.stdout.write(self.style.SUCCESS(
+                f"{run['teachers']} teachers, {run['divisions_per_semester']} divisions ({run['slots']} slots)"
+            ))
+            for case, metrics in run["results"].items():
+                memory = "" if metrics["peak_memory"] is None else f", peak {metrics['peak_memory'] / 1024:.0f} KiB"
+                self.stdout.write(f"  {case:<20} {metrics['wall_time'] * 1000:10.1f} ms, {metrics['queries']} queries{memory}")
+
+        if options['compare']:
+            with open(options['compare']) as handle:
+                old = json.load(handle)
+            self.stdout.write("Compared with " + options['compare'])
+            for (teachers, divisions), case, metric, before, after in compare_reports(old, report):
+                change = f"{after / before:.2f}x" if before else "n/a"
+                self.stdout.write(f"  {teachers}/{divisions} {case:<20} {metric:<12} {before} -> {after} ({change})")
+
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(report, handle, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from crud.export import export_rows, iter_csv, iter_ics
+
+
+class Command(BaseCommand):
+    help = "Export every timetable, or one division's or teacher's, as CSV or iCalendar"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=['csv', 'ics'], default='csv')
+        parser.add_argument('--output', help='File to write, standard output when left out')
+        parser.add_argument('--semester', type=int)
+        parser.add_argument('--grade')
+        parser.add_argument('--teacher', type=int, help='Teacher id')
+        parser.add_argument('--chunk-size', type=int, help='Rows fetched per round trip')
+
+    def handle(self, *args, **options):
+        rows = export_rows(
+            semester=options['semester'], grade=options['grade'], teacher=options['teacher'],
+            chunk_size=options['chunk_size'],
+        )
+
+        chunks = iter_csv(rows) if options['format'] == 'csv' else iter_ics(rows, "Timetable")
+        if options['output']:
+            with open(options['output'], 'w', newline='') as handle:
+                handle.writelines(chunks)
+            self.stderr.write(self.style.SUCCESS(f"Timetable exported to {options['output']}"))
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
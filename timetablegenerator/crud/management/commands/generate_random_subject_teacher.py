@@ -1,61 +1,85 @@
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from faker import Faker
 from crud.models import Teachers, Subjects, Teacher_Subject  # Adjust the import based on your app structure
-from random import choice, sample
+from random import Random
 from .generate_timetable import SEMESTER_DIVISIONS
 import datetime
 
 class Command(BaseCommand):
-    help = 'Generates random teachers, subjects, and assigns teachers to subjects'
+    help = (
+        'Generates random teachers, subjects, and assigns teachers to subjects. '
+        'Use --verbosity 0 for no output, 1 for progress per batch, 2 for a line per object.'
+    )
 
-    def handle(self, *args, **kwargs):
+    def add_arguments(self, parser):
+        parser.add_argument('--teachers', type=int, default=50, help='Number of teachers to create')
+        parser.add_argument('--semesters', type=int, nargs='+', default=sorted(SEMESTER_DIVISIONS),
+                            help='Semesters to create subjects for')
+        parser.add_argument('--subjects-per-semester', type=int, default=8)
+        parser.add_argument('--seed', type=int, help='Seed for reproducible data')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per INSERT statement')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        self.batch_size = options['batch_size']
+        rng = Random(options['seed'])
         fake = Faker()
+        if options['seed'] is not None:
+            fake.seed_instance(options['seed'])
 
-        # Step 1: Create 50 random teachers
-        teachers = []  # To hold created teachers
-        for _ in range(50):
-            name = fake.name()
-            phone_number = fake.phone_number()
-            department = 'COMPUTER SCIENCE'  # Modify this if you want random departments
-            
-            # Create a Teacher instance and save it
-            teacher = Teachers.objects.create(
-                name=name,
-                phone_number=phone_number,
-                department=department
-            )
-            teachers.append(teacher)  # Add the teacher to the list
-            self.stdout.write(self.style.SUCCESS(f'Successfully created teacher: {name}'))
-
-        # Step 2: Create 8 random subjects for each semester from Semester 3 to Semester 8
-        subjects = []  # To hold created subjects
-        for semester in range(3, 9):
-            for _ in range(8):  # 8 subjects per semester
-                subject_name = fake.word().capitalize() + " " + fake.word().capitalize()  # Random subject name
-                subject_code = fake.bothify(text='???-####', letters='ABCDEFGHIJKLMNOPQRSTUVWXYZ')  # Random subject code
-
-                # Create a Subject instance and save it
-                subject = Subjects.objects.create(
-                    semester=semester,
-                    name=subject_name,
-                    subject_code=subject_code
+        # Everything is generated in memory first and written in batches in one transaction
+        with transaction.atomic():
+            # Step 1: Create random teachers
+            teachers = self.create_in_batches(Teachers, [
+                Teachers(
+                    name=fake.name()[:15],
+                    phone_number=fake.phone_number()[:15],
+                    department='COMPUTER SCIENCE',  # Modify this if you want random departments
                 )
-                subjects.append(subject)  # Add the subject to the list
-                self.stdout.write(self.style.SUCCESS(f'Successfully created subject: {subject_name} for Semester {semester}'))
-
-        # Step 3: Assign teachers to random subjects and set assigned_date
-        for teacher in teachers:
-            # Randomly pick between 3 to 6 subjects for each teacher (you can modify the range)
-            num_subjects = choice(range(3, 7))  # A teacher gets between 3 and 6 subjects
-            selected_subjects = sample(subjects, num_subjects)  # Randomly pick subjects for the teacher
-
-            # Assign selected subjects to the teacher and set the assigned_date
-            for subject in selected_subjects:
-                # Here we create Teacher_Subject instances and set the assigned_date
-                Teacher_Subject.objects.create(
-                    teacher=teacher,
-                    subject=subject,
-                    assigned_date=datetime.date.today()  # or set any specific date
+                for _ in range(options['teachers'])
+            ], 'teacher')
+
+            # Step 2: Create random subjects for each semester
+            subjects = self.create_in_batches(Subjects, [
+                Subjects(
+                    semester=semester,
+                    name=fake.word().capitalize() + " " + fake.word().capitalize(),  # Random subject name
+                    subject_code=fake.bothify(text='???-####', letters='ABCDEFGHIJKLMNOPQRSTUVWXYZ'),  # Random subject code
                 )
+                for semester in options['semesters']
+                for _ in range(options['subjects_per_semester'])
+            ], 'subject')
+
+            # Step 3: Assign every teacher to 3 to 6 random subjects
+            today = datetime.date.today()
+            assignments = [
+                Teacher_Subject(teacher=teacher, subject=subject, assigned_date=today)
+                for teacher in teachers
+                for subject in rng.sample(subjects, min(len(subjects), rng.randint(3, 6)))
+            ]
+            self.create_in_batches(Teacher_Subject, assignments, 'assignment')
+
+        if self.verbosity:
+            self.stdout.write(self.style.SUCCESS(
+                f'Successfully created {len(teachers)} teachers, {len(subjects)} subjects '
+                f'and {len(assignments)} teacher-subject assignments'
+            ))
+
+    def create_in_batches(self, model, objects, label):
+        created = []
+        for start in range(0, len(objects), self.batch_size):
+            batch = model.objects.bulk_create(objects[start:start + self.batch_size])
+            created.extend(batch)
+            if self.verbosity >= 2:
+                for obj in batch:
+                    self.stdout.write(self.style.SUCCESS(f'Successfully created {label}: {obj}'))
+            elif self.verbosity == 1:
+                self.stdout.write(f'Created {len(created)}/{len(objects)} {label}s')
 
-            self.stdout.write(self.style.SUCCESS(f'Successfully assigned {num_subjects} subjects to teacher: {teacher.name}'))
+        # Backends that can't return ids from a bulk insert need them fetched for the assignments
+        if created and created[0].pk is None:
+            ids = model.objects.order_by('-pk').values_list('pk', flat=True)[:len(created)]
+            for obj, pk in zip(created, sorted(ids)):
+                obj.pk = pk
+        return created
@@ -1,4 +1,10 @@
-from crud.models import Subjects, Timetable
+import logging
+
+from django.db import transaction
+from crud.cache import invalidate_all
+from crud.models import Timetable
+
+logger = logging.getLogger(__name__)
 
 # Define semester-to-division mapping
 SEMESTER_DIVISIONS = {
@@ -10,37 +16,36 @@ SEMESTER_DIVISIONS = {
     8: ['A', 'B']
 }
 
-def generate_timetable():
-    days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
-    time_slots = [
-        '09:00-09:50', '09:50-10:40', '10:50-11:40', '11:40-12:30',
-        '01:15-02:05', '02:05-02:55', '03:05-04:00'
+def generate_timetable(divisions=SEMESTER_DIVISIONS, batch_size=1000):
+    days = [day for day, _ in Timetable.DAY_CHOICES]
+    time_slots = [slot for slot, _ in Timetable.TIME_SLOTS]
+
+    # Build every empty slot in memory first
+    entries = [
+        Timetable(semester=semester, grade=grade, day=day, time_slot=time_slot)
+        for semester, grades in divisions.items()
+        for grade in grades  # Iterate through the divisions
+        for day in days
+        for time_slot in time_slots
     ]
 
-    # Fetch subjects grouped by semester
-    subjects_by_semester = {sem: list(Subjects.objects.filter(semester=sem)) for sem in SEMESTER_DIVISIONS.keys()}
-
-    # Create timetable entries
-    for semester, divisions in SEMESTER_DIVISIONS.items():
-        for grade in divisions:  # Iterate through the divisions
-            for day in days:
-                for time_slot in time_slots:
-                    # Assign subjects round-robin style
-                    Timetable.objects.create(
-                        semester=semester,
-                        grade=grade,
-                        day=day,
-                        time_slot=time_slot,
-                        subject=None  # You can modify this to assign subjects dynamically
-                    )
-
-    print("Timetable generated successfully with divisions.")
+    # One transaction, a few batched INSERTs. Slots that already exist are left
+    # alone, so running this again keeps whatever has been assigned so far.
+    with transaction.atomic():
+        Timetable.objects.bulk_create(entries, batch_size=batch_size, ignore_conflicts=True)
+    invalidate_all()
+
+    logger.info(f"Generated {len(entries)} timetable slots")
+    return len(entries)
 
 from django.core.management.base import BaseCommand
 
 class Command(BaseCommand):
     help = "Generate timetable automatically"
 
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per INSERT statement')
+
     def handle(self, *args, **kwargs):
-        generate_timetable()
+        generate_timetable(batch_size=kwargs['batch_size'])
         self.stdout.write(self.style.SUCCESS("Timetable generated successfully!"))
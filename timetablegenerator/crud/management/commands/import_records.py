@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from crud.importer import KINDS, import_records, read_rows
+
+
+class Command(BaseCommand):
+    help = "Import teachers, subjects or teacher-subject qualifications from a .csv, .jsonl or .json file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=KINDS)
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows validated and written together')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'rb') as handle:
+                report = import_records(options['kind'], read_rows(handle, options['path']), options['batch_size'])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for error in report['errors']:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['rows']} {options['kind']} rows: {report['created']} created, "
+            f"{report['updated']} updated, {report['skipped']} skipped"
+        ))
@@ -0,0 +1,71 @@
+import json
+import urllib.error
+
+from django.core.management.base import BaseCommand, CommandError
+
+from crud.loadtest import DEFAULT_PATHS, login, run_load_test
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare requests per second and p50/p99 latency of running deployments on the hot read endpoints, "
+        "e.g. the sync views under WSGI against the async ones under ASGI. See crud/loadtest.py."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', action='append', required=True, metavar='NAME=URL',
+                            help='A deployment to load, repeat for each one')
+        parser.add_argument('--path', action='append', dest='paths',
+                            help='Path to request, repeat for several (default: the hot read endpoints)')
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per path and target')
+        parser.add_argument('--concurrency', type=int, default=200, help='Connections open at once')
+        parser.add_argument('--warmup', type=int, default=50, help='Requests per path before measuring')
+        parser.add_argument('--timeout', type=float, default=30, help='Seconds before a request counts as failed')
+        parser.add_argument('--email', help='Admin to log in as on every target')
+        parser.add_argument('--password')
+        parser.add_argument('--token', help='Access token to send instead of logging in')
+        parser.add_argument('--output', help='Write the JSON report to this file')
+
+    def handle(self, *args, **options):
+        targets = {}
+        for target in options['target']:
+            name, _, url = target.partition('=')
+            if not url:
+                raise CommandError(f"--target must look like NAME=URL, not '{target}'")
+            targets[name] = url
+
+        tokens = {name: options['token'] for name in targets}
+        if options['email']:
+            try:
+                tokens = {name: login(url, options['email'], options['password'] or '') for name, url in targets.items()}
+            except (urllib.error.URLError, KeyError, ValueError) as e:
+                raise CommandError(f"Could not log in: {e}")
+
+        report = run_load_test(
+            targets,
+            paths=options['paths'] or DEFAULT_PATHS,
+            requests=options['requests'],
+            concurrency=options['concurrency'],
+            warmup=options['warmup'],
+            tokens=tokens,
+            timeout=options['timeout'],
+            progress=lambda message: self.stderr.write(f"Loading {message}"),
+        )
+
+        for result_index, path in enumerate(options['paths'] or DEFAULT_PATHS):
+            self.stdout.write(self.style.SUCCESS(path))
+            for name, target in report["targets"].items():
+                result = target["results"][result_index]
+                errors = sum(result["errors"].values())
+                latency = "no successful requests" if result["p50"] is None else (
+                    f"p50 {result['p50'] * 1000:7.1f} ms, p99 {result['p99'] * 1000:7.1f} ms"
+                )
+                self.stdout.write(
+                    f"  {name:<10} {result['requests_per_second']:9.1f} req/s, {latency}, {errors} errors"
+                    + (f" {result['errors']}" if errors else "")
+                )
+
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(report, handle, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
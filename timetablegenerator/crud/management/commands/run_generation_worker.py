@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from crud.jobs import run_worker, shares_cache_with_web_server
+
+
+class Command(BaseCommand):
+    help = "Run queued timetable generation jobs (populate, clear, repair) from the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to wait between checks of an empty queue')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        if not shares_cache_with_web_server():
+            # The web server would keep serving the grids cached before a job changed them
+            raise CommandError(
+                "The timetable cache is local to each process, so the web server would not see the worker's "
+                "changes. Configure a shared cache (database, file, Redis...) in CACHES first."
+            )
+        self.stdout.write(self.style.SUCCESS("Generation worker started"))
+        run_worker(poll_interval=options['poll_interval'], once=options['once'])
@@ -1,10 +1,11 @@
 from django.db import models
+from django.db.models import Case, Value, When
 
 # Create your models here.
 class Teachers(models.Model):
     name = models.CharField(max_length=15)
     phone_number=models.CharField(max_length=15)
-    department=models.CharField(max_length=10,default='COMPUTER SCIENCE')
+    department=models.CharField(max_length=50,default='COMPUTER SCIENCE')
     subjects=models.ManyToManyField('Subjects',through='Teacher_Subject')
 
     def __str__(self):
@@ -30,6 +31,24 @@ class Teacher_Subject(models.Model):
         return f"{self.teacher.name} - {self.subject.name}"
 
 
+class TimetableQuerySet(models.QuerySet):
+    def with_related(self):
+        # Subject and teacher come in the same query instead of one query per row each
+        return self.select_related('subject', 'teacher')
+
+    def in_week_order(self):
+        # Day and slot labels don't sort correctly as strings, their ordinals do
+        return self.order_by('day_number', 'slot_number')
+
+
+def _ordinal(field, choices):
+    # Position of the label in its choices, computed by the database on every write
+    return Case(
+        *[When(**{field: label}, then=Value(rank)) for rank, (label, _) in enumerate(choices)],
+        output_field=models.SmallIntegerField(),
+    )
+
+
 class Timetable(models.Model):
     DAY_CHOICES = [
         ('Monday', 'Monday'),
@@ -56,8 +75,64 @@ class Timetable(models.Model):
     subject = models.ForeignKey(Subjects, on_delete=models.CASCADE, null=True, blank=True)
     teacher = models.ForeignKey(Teachers, on_delete=models.CASCADE, null=True, blank=True)
 
+    # Integer forms of day and time_slot for sorting and range lookups, NULL for unknown labels.
+    # The labels stay the API's format, these are never written directly.
+    day_number = models.GeneratedField(
+        expression=_ordinal('day', DAY_CHOICES), output_field=models.SmallIntegerField(null=True), db_persist=True
+    )
+    slot_number = models.GeneratedField(
+        expression=_ordinal('time_slot', TIME_SLOTS), output_field=models.SmallIntegerField(null=True), db_persist=True
+    )
+
+    objects = TimetableQuerySet.as_manager()
+
     class Meta:
+        # The unique key also serves the (semester, day, time_slot, grade) lookups of the edit views
         unique_together = ('semester', 'day', 'time_slot','grade')
+        indexes = [
+            # A division's week, already in week order
+            models.Index(fields=['semester', 'grade', 'day_number', 'slot_number'], name='timetable_division_week'),
+            # A teacher's week, for schedules and clash checks
+            models.Index(fields=['teacher', 'day_number', 'slot_number'], name='timetable_teacher_week'),
+        ]
 
     def __str__(self):
         return f"Sem {self.semester}: {self.day} - {self.time_slot} - {self.subject} ({self.teacher})"
+
+
+class GenerationJob(models.Model):
+    """A populate/clear/repair run queued by the API and executed by the generation worker."""
+
+    KIND_CHOICES = [
+        ('populate', 'populate'),
+        ('clear', 'clear'),
+        ('repair', 'repair'),
+    ]
+
+    STATUS_CHOICES = [
+        ('queued', 'queued'),
+        ('running', 'running'),
+        ('done', 'done'),
+        ('failed', 'failed'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    payload = models.JSONField(default=dict, blank=True)
+    slots_total = models.IntegerField(default=0)
+    slots_filled = models.IntegerField(default=0)
+    updated = models.IntegerField(default=0)
+    conflicts = models.JSONField(default=list, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Stamped by the worker while the job runs; a stale one means the worker died
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'created_at'])]
+
+    def __str__(self):
+        return f"Job {self.pk}: {self.kind} ({self.status})"
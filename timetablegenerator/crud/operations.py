@@ -0,0 +1,55 @@
+import logging
+
+from .cache import invalidate, invalidate_all
+from .models import Timetable
+from .solver import load_problem, load_repair_problem, save_solution, solve, solve_in_parallel
+
+logger = logging.getLogger(__name__)
+
+
+def _open_cells(problem):
+    return sum(1 for cell in problem.cells if not cell.pinned and not cell.is_complete)
+
+
+def _log_unsatisfied(solution):
+    for unsatisfied in solution.unsatisfied:
+        logger.warning(f"Could not satisfy: {unsatisfied}")
+
+
+def populate_timetable(progress=None):
+    """
+    Fill every empty slot with the solver and save the result.
+
+    ``progress`` is called with (cells filled, cells to fill) while solving.
+    Returns the number of rows changed and the solver's Solution.
+    """
+    problem = load_problem()
+    total = _open_cells(problem)
+    if progress:
+        progress(0, total)
+    solution = solve_in_parallel(problem, progress=progress and (lambda filled: progress(filled, total)))
+    updated = save_solution(solution)
+    invalidate_all()
+    _log_unsatisfied(solution)
+    return updated, solution
+
+
+def repair_timetable(dirty, avoid=None, progress=None):
+    """Re-solve only the given (semester, grade, day, time_slot) slots and save the result."""
+    problem = load_repair_problem(dirty, avoid)
+    total = _open_cells(problem)
+    if progress:
+        progress(0, total)
+    solution = solve(problem, progress and (lambda filled: progress(filled, total)))
+    updated = save_solution(solution)
+    for semester, grade in {(cell.semester, cell.grade) for cell in problem.cells}:
+        invalidate(semester, grade)
+    _log_unsatisfied(solution)
+    return updated, solution
+
+
+def clear_timetable():
+    """Remove every teacher and subject from every slot. Returns the number of rows changed."""
+    updated = Timetable.objects.update(subject=None, teacher=None)
+    invalidate_all()
+    return updated
@@ -0,0 +1,116 @@
+import json
+from operator import itemgetter
+
+try:
+    import orjson
+except ImportError:  # optional, the standard library encoder gives the same bytes
+    orjson = None
+
+# TimetableSerializer's fields, in its order, and the columns they are read from.
+# subject and teacher are the models' __str__, which is their name.
+GRID_FIELDS = (
+    ('semester', 'semester'),
+    ('day', 'day'),
+    ('time_slot', 'time_slot'),
+    ('subject_id', 'subject_id'),
+    ('subject', 'subject__name'),
+    ('teacher', 'teacher__name'),
+    ('teacher_id', 'teacher_id'),
+)
+
+_KEYS = tuple(key for key, _ in GRID_FIELDS)
+_COLUMNS = tuple(column for _, column in GRID_FIELDS)
+
+
+def grid_rows(queryset):
+    """
+    The dicts TimetableSerializer(many=True) would produce for ``queryset``,
+    built from one joined values_list() query instead of model instances.
+    """
+    return [dict(zip(_KEYS, row)) for row in queryset.values_list(*_COLUMNS)]
+
+
+async def agrid_rows(queryset):
+    """grid_rows() for async views."""
+    # values() rather than values_list(), whose iterator runs its query as soon as it
+    # is created, on the event loop instead of in the thread aiterator() hands it to
+    return [
+        {key: row[column] for key, column in GRID_FIELDS}
+        async for row in queryset.values(*_COLUMNS).aiterator()
+    ]
+
+
+def dumps(data):
+    """
+    Encode to the same bytes as DRF's JSONRenderer: compact, UTF-8, with
+    U+2028 and U+2029 escaped. Uses orjson when it is installed.
+    """
+    if orjson is not None:
+        body = orjson.dumps(data)
+    else:
+        body = json.dumps(data, ensure_ascii=False, separators=(',', ':'), allow_nan=False).encode()
+    return body.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+def _lookup(table, index, pk, name):
+    if pk is None:
+        return None
+    if pk not in index:
+        index[pk] = len(table)
+        table.append({"id": pk, "name": name})
+    return index[pk]
+
+
+_GRID_COLUMNS = (
+    'semester', 'grade', 'day_number', 'slot_number', 'subject_id', 'subject__name', 'teacher_id', 'teacher__name'
+)
+
+
+def _in_grid_order(queryset):
+    return queryset.order_by('semester', 'grade', 'day_number', 'slot_number')
+
+
+def _build_grids(model, rows):
+    days = [day for day, _ in model.DAY_CHOICES]
+    slots = [slot for slot, _ in model.TIME_SLOTS]
+    subjects, teachers = [], []
+    subject_index, teacher_index = {}, {}
+    grids = {}
+
+    for semester, grade, day_number, slot_number, subject_id, subject_name, teacher_id, teacher_name in rows:
+        grid = grids.get((semester, grade))
+        if grid is None:
+            grid = grids[(semester, grade)] = [[None] * len(slots) for _ in days]
+        if day_number is None or slot_number is None or (subject_id is None and teacher_id is None):
+            continue
+        grid[day_number][slot_number] = [
+            _lookup(subjects, subject_index, subject_id, subject_name),
+            _lookup(teachers, teacher_index, teacher_id, teacher_name),
+        ]
+
+    return {
+        "days": days,
+        "time_slots": slots,
+        "subjects": subjects,
+        "teachers": teachers,
+        "divisions": [
+            {"semester": semester, "grade": grade, "grid": grid} for (semester, grade), grid in grids.items()
+        ],
+    }
+
+
+def compact_grids(queryset):
+    """
+    One or more divisions in the ``?layout=grid`` shape: day and slot labels
+    once, subjects and teachers once each in lookup tables, and per division
+    a day by slot matrix. A cell is ``[subject, teacher]`` as positions in
+    the lookup tables (either may be null), or null when the slot is empty.
+    """
+    return _build_grids(queryset.model, _in_grid_order(queryset).values_list(*_GRID_COLUMNS))
+
+
+async def acompact_grids(queryset):
+    """compact_grids() for async views."""
+    as_row = itemgetter(*_GRID_COLUMNS)
+    rows = [as_row(values) async for values in _in_grid_order(queryset).values(*_GRID_COLUMNS).aiterator()]
+    return _build_grids(queryset.model, rows)
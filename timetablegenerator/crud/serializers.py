@@ -1,21 +1,69 @@
 from rest_framework import serializers
-from .models import Teachers,Subjects,Teacher_Subject,Timetable
+from django.utils import timezone
+from .filters import expanded
+from .models import Teachers,Subjects,Teacher_Subject,Timetable,GenerationJob
 
-class TeachersSerializer(serializers.ModelSerializer):
+
+class SparseFieldsMixin:
+    """Only render the fields listed in ?fields=, e.g. ?fields=id,name."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        requested = request.query_params.get('fields') if request is not None else None
+        if requested:
+            keep = set(requested.split(','))
+            for name in set(self.fields) - keep:
+                self.fields.pop(name)
+
+
+class SubjectSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Subjects
+        fields = ['id', 'name', 'subject_code', 'semester']
+
+
+class TeacherSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Teachers
+        fields = ['id', 'name', 'department']
+
+
+class TeachersSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Teachers
         fields = '__all__'
 
-class SubjectSerializer(serializers.ModelSerializer):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # ?expand=subjects renders the subjects themselves instead of their ids
+        if 'subjects' in self.fields and expanded(self.context.get('request'), 'subjects'):
+            self.fields['subjects'] = SubjectSummarySerializer(many=True, read_only=True)
+
+class SubjectSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model=Subjects
         fields='__all__'
 
-class TeacherSubjectSerializer(serializers.ModelSerializer):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # ?expand=teachers adds the teachers qualified for the subject
+        if expanded(self.context.get('request'), 'teachers'):
+            self.fields['teachers'] = TeacherSummarySerializer(source='teachers_set', many=True, read_only=True)
+
+class TeacherSubjectSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model=Teacher_Subject
         fields='__all__'
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if 'teacher' in self.fields and expanded(request, 'teacher'):
+            self.fields['teacher'] = TeacherSummarySerializer(read_only=True)
+        if 'subject' in self.fields and expanded(request, 'subject'):
+            self.fields['subject'] = SubjectSummarySerializer(read_only=True)
+
 class TimetableSerializer(serializers.ModelSerializer):
     subject = serializers.StringRelatedField()  # For string representation
     subject_id = serializers.PrimaryKeyRelatedField(source='subject', read_only=True)  # For ID
@@ -25,4 +73,18 @@ class TimetableSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Timetable
-        fields = ['semester', 'day', 'time_slot', 'subject_id' ,'subject', 'teacher','teacher_id']
\ No newline at end of file
+        fields = ['semester', 'day', 'time_slot', 'subject_id' ,'subject', 'teacher','teacher_id']
+
+class GenerationJobSerializer(serializers.ModelSerializer):
+    elapsed = serializers.SerializerMethodField()
+
+    class Meta:
+        model = GenerationJob
+        fields = ['id', 'kind', 'status', 'slots_total', 'slots_filled', 'updated', 'conflicts', 'error',
+                  'created_at', 'started_at', 'finished_at', 'attempts', 'elapsed']
+
+    def get_elapsed(self, job):
+        # Seconds spent running so far, or in total once finished
+        if job.started_at is None:
+            return 0
+        return ((job.finished_at or timezone.now()) - job.started_at).total_seconds()
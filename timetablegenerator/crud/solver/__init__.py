@@ -0,0 +1,6 @@
+from .engine import Engine, solve
+from .loader import load_occupancy, load_problem, load_repair_problem, save_solution, week_labels
+from .matrix import TimetableMatrix
+from .occupancy import TeacherOccupancy
+from .parallel import solve_in_parallel, split_components
+from .problem import Cell, Problem, Solution
@@ -0,0 +1,275 @@
+import logging
+
+from .occupancy import TeacherOccupancy
+from .problem import Cell, Solution
+
+logger = logging.getLogger(__name__)
+
+
+class Engine:
+    """
+    Fills the empty cells of a Problem without double-booking any teacher.
+
+    The week is walked one time slot at a time. For every slot the open cells
+    of all sections are matched to (subject, teacher) pairs with augmenting
+    paths, so a teacher is never used twice in the same slot and as many cells
+    as possible get filled. Each section spreads its slots evenly over the
+    subjects of its semester; subjects that are furthest behind their weekly
+    hours are tried first. Cells left empty afterwards are repaired by swapping
+    them with solver-filled cells of the same section.
+    """
+
+    def __init__(self, problem, progress=None):
+        self.problem = problem
+        # Called with the number of cells filled so far after every time slot
+        self.progress = progress
+        self.filled = 0
+        # Work on copies so the caller's problem can be solved again
+        self.cells = []
+        for cell in problem.cells:
+            copy = Cell(cell.row_id, cell.semester, cell.grade, cell.time, cell.subject_id, cell.teacher_id)
+            copy.pinned = cell.pinned
+            self.cells.append(copy)
+        self.original = {cell.row_id: (cell.subject_id, cell.teacher_id) for cell in self.cells}
+        # Unless the problem says otherwise, only cells that started out completely
+        # empty may be moved by the repair pass
+        if problem.movable is not None:
+            self.movable = problem.movable
+        else:
+            self.movable = {cell.row_id for cell in self.cells if cell.subject_id is None and cell.teacher_id is None}
+
+        self.sections = {}
+        self.by_time = [[] for _ in range(problem.week_length)]
+        for cell in self.cells:
+            self.sections.setdefault(cell.section, []).append(cell)
+            if 0 <= cell.time < problem.week_length:
+                self.by_time[cell.time].append(cell)
+
+        self.qualified = {subject_id: set(teachers) for subject_id, teachers in problem.qualified.items()}
+        self.occupancy = TeacherOccupancy(problem.days, problem.slots)
+        self.load = {}
+        # {(section, subject_id): teacher_id} so a class keeps the same teacher for a subject
+        self.sticky = {}
+        # {section: {subject_id: hours still to place}}
+        self.remaining = {}
+        # [(section, subject_id)] for subjects without a single qualified teacher
+        self.untaught = []
+
+    def solve(self):
+        self._seed()
+        for time in range(self.problem.week_length):
+            self._fill_time(time)
+            if self.progress:
+                self.progress(self.filled)
+        self._repair()
+        if self.progress:
+            self.progress(self.filled)
+        return self._solution()
+
+    def _seed(self):
+        for teacher_id, time in self.problem.bookings:
+            self.occupancy.book(teacher_id, time)
+            self.load[teacher_id] = self.load.get(teacher_id, 0) + 1
+
+        for cell in self.cells:
+            if cell.teacher_id is None:
+                continue
+            self.occupancy.book(cell.teacher_id, cell.time)
+            self.load[cell.teacher_id] = self.load.get(cell.teacher_id, 0) + 1
+            if cell.subject_id is not None:
+                self.sticky.setdefault((cell.section, cell.subject_id), cell.teacher_id)
+
+        for section, cells in self.sections.items():
+            subjects = self.problem.subjects_by_semester.get(section[0], [])
+            # Subjects nobody can teach are reported once and left out of the share
+            untaught = [subject_id for subject_id in subjects if not self.problem.qualified.get(subject_id)]
+            subjects = [subject_id for subject_id in subjects if subject_id not in untaught]
+            self.untaught.extend((section, subject_id) for subject_id in untaught)
+            if not subjects:
+                continue
+            # Weekly hours per subject: the section's slots shared out evenly
+            base, extra = divmod(len(cells), len(subjects))
+            remaining = {subject_id: base + (1 if index < extra else 0) for index, subject_id in enumerate(subjects)}
+            for cell in cells:
+                if cell.subject_id in remaining:
+                    remaining[cell.subject_id] -= 1
+            self.remaining[section] = remaining
+
+    def _teachers_for(self, section, subject_id):
+        sticky = self.sticky.get((section, subject_id))
+        return sorted(
+            self.problem.qualified.get(subject_id, ()),
+            key=lambda teacher_id: (teacher_id != sticky, self.load.get(teacher_id, 0), teacher_id),
+        )
+
+    def _subjects_for(self, cell):
+        if cell.subject_id is not None:
+            return [cell.subject_id]
+        remaining = self.remaining.get(cell.section, {})
+        return sorted(
+            (subject_id for subject_id, left in remaining.items() if left > 0),
+            key=lambda subject_id: (-remaining[subject_id], subject_id),
+        )
+
+    def _allowed(self, cell, teacher_id):
+        return teacher_id not in self.problem.avoid.get(cell.row_id, ())
+
+    def _options(self, cell):
+        options = []
+        for subject_id in self._subjects_for(cell):
+            for teacher_id in self._teachers_for(cell.section, subject_id):
+                if self._allowed(cell, teacher_id) and not self.occupancy.is_busy(teacher_id, cell.time):
+                    options.append((subject_id, teacher_id))
+        return options
+
+    def _fill_time(self, time):
+        candidates = {}
+        for cell in self.by_time[time]:
+            if cell.pinned or cell.is_complete:
+                continue
+            if cell.teacher_id is not None:
+                self._pick_subject(cell)
+                continue
+            options = self._options(cell)
+            if options:
+                candidates[cell] = options
+
+        # Maximum matching of open cells to free teachers for this slot
+        owner = {}
+        chosen = {}
+        for cell in sorted(candidates, key=lambda cell: len(candidates[cell])):
+            self._augment(cell, candidates, owner, chosen, set())
+
+        for cell, (subject_id, teacher_id) in chosen.items():
+            self._assign(cell, subject_id, teacher_id)
+
+    def _augment(self, cell, candidates, owner, chosen, seen):
+        for subject_id, teacher_id in candidates[cell]:
+            if teacher_id in seen:
+                continue
+            seen.add(teacher_id)
+            holder = owner.get(teacher_id)
+            if holder is None or self._augment(holder, candidates, owner, chosen, seen):
+                owner[teacher_id] = cell
+                chosen[cell] = (subject_id, teacher_id)
+                return True
+        return False
+
+    def _assign(self, cell, subject_id, teacher_id):
+        if cell.subject_id is None:
+            self.remaining[cell.section][subject_id] -= 1
+        cell.subject_id = subject_id
+        cell.teacher_id = teacher_id
+        self.filled += 1
+        self.occupancy.book(teacher_id, cell.time)
+        self.load[teacher_id] = self.load.get(teacher_id, 0) + 1
+        self.sticky.setdefault((cell.section, subject_id), teacher_id)
+
+    def _pick_subject(self, cell):
+        # The teacher was placed by hand, so pick the subject they are furthest behind on
+        remaining = self.remaining.get(cell.section, {})
+        subjects = [
+            subject_id for subject_id in self.problem.subjects_by_semester.get(cell.semester, [])
+            if cell.teacher_id in self.qualified.get(subject_id, ())
+        ]
+        if not subjects:
+            return
+        subject_id = max(subjects, key=lambda subject_id: (remaining.get(subject_id, 0), -subject_id))
+        if subject_id in remaining:
+            remaining[subject_id] -= 1
+        cell.subject_id = subject_id
+        self.filled += 1
+        self.sticky.setdefault((cell.section, subject_id), cell.teacher_id)
+
+    def _repair(self):
+        for cell in self.cells:
+            if cell.is_complete or cell.row_id not in self.movable:
+                continue
+            self._repair_cell(cell)
+
+    def _repair_cell(self, cell):
+        is_busy = self.occupancy.is_busy
+        for subject_id in self._subjects_for(cell):
+            for teacher_id in self._teachers_for(cell.section, subject_id):
+                if not self._allowed(cell, teacher_id):
+                    continue
+                if not is_busy(teacher_id, cell.time):
+                    self._assign(cell, subject_id, teacher_id)
+                    return True
+                # The teacher is busy now: move one of the section's other lessons into this
+                # slot and give its old slot to the teacher instead
+                for other in self.sections[cell.section]:
+                    if other is cell or not other.is_complete or other.row_id not in self.movable:
+                        continue
+                    if is_busy(teacher_id, other.time) or is_busy(other.teacher_id, cell.time):
+                        continue
+                    if not self._allowed(other, teacher_id) or not self._allowed(cell, other.teacher_id):
+                        continue
+                    moved_subject, moved_teacher = other.subject_id, other.teacher_id
+                    had_subject = cell.subject_id is not None
+                    self.occupancy.free(moved_teacher, other.time)
+                    self.occupancy.book(teacher_id, other.time)
+                    self.occupancy.book(moved_teacher, cell.time)
+                    other.subject_id, other.teacher_id = subject_id, teacher_id
+                    cell.subject_id, cell.teacher_id = moved_subject, moved_teacher
+                    self.filled += 1
+                    if not had_subject:
+                        self.remaining[cell.section][subject_id] -= 1
+                    self.load[teacher_id] = self.load.get(teacher_id, 0) + 1
+                    self.sticky.setdefault((cell.section, subject_id), teacher_id)
+                    return True
+        return False
+
+    def _reason(self, cell):
+        if not self.remaining.get(cell.section):
+            return f"No teachable subjects found for semester {cell.semester}"
+        if cell.teacher_id is not None:
+            return "Teacher is not qualified for any subject of this semester"
+        if cell.subject_id is not None:
+            return "No qualified teacher is free for this subject in this slot"
+        return "No qualified teacher is free in this slot"
+
+    def _solution(self):
+        solution = Solution()
+        solution.filled = self.filled
+        for cell in self.cells:
+            current = (cell.subject_id, cell.teacher_id)
+            if current != self.original[cell.row_id]:
+                solution.assignments[cell.row_id] = current
+            if not cell.pinned and not cell.is_complete:
+                day, time_slot = self.problem.label(cell.time)
+                solution.unsatisfied.append({
+                    "type": "slot",
+                    "semester": cell.semester,
+                    "grade": cell.grade,
+                    "day": day,
+                    "time_slot": time_slot,
+                    "reason": self._reason(cell),
+                })
+
+        for (semester, grade), subject_id in sorted(self.untaught):
+            solution.unsatisfied.append({
+                "type": "subject",
+                "semester": semester,
+                "grade": grade,
+                "subject_id": subject_id,
+                "reason": "No teacher is qualified for this subject",
+            })
+
+        for (semester, grade), remaining in sorted(self.remaining.items()):
+            for subject_id, left in sorted(remaining.items()):
+                if left > 0:
+                    solution.unsatisfied.append({
+                        "type": "hours",
+                        "semester": semester,
+                        "grade": grade,
+                        "subject_id": subject_id,
+                        "missing_hours": left,
+                    })
+
+        logger.info(f"Solver filled {len(solution.assignments)} cells, {len(solution.unsatisfied)} problems left")
+        return solution
+
+
+def solve(problem, progress=None):
+    return Engine(problem, progress).solve()
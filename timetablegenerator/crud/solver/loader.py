@@ -0,0 +1,133 @@
+from django.db import transaction
+from django.db.models import Q
+
+from crud.models import Subjects, Teacher_Subject, Timetable
+
+from .occupancy import TeacherOccupancy
+from .problem import Cell, Problem
+
+def week_labels():
+    days = [day for day, _ in Timetable.DAY_CHOICES]
+    slots = [slot for slot, _ in Timetable.TIME_SLOTS]
+    return days, slots
+
+
+# Timetable columns a Cell is built from, days and slots as their ordinals
+CELL_FIELDS = ('id', 'semester', 'grade', 'day_number', 'slot_number', 'subject_id', 'teacher_id')
+
+
+def _cells(rows, slots):
+    cells = []
+    for row_id, semester, grade, day_number, slot_number, subject_id, teacher_id in rows:
+        if day_number is None or slot_number is None:
+            continue
+        cells.append(Cell(row_id, semester, grade, day_number * len(slots) + slot_number, subject_id, teacher_id))
+    return cells
+
+
+def _subjects_and_qualifications(semesters=None):
+    subjects = Subjects.objects.all()
+    qualifications = Teacher_Subject.objects.all()
+    if semesters is not None:
+        subjects = subjects.filter(semester__in=semesters)
+        qualifications = qualifications.filter(subject__semester__in=semesters)
+
+    subjects_by_semester = {}
+    for subject_id, semester in subjects.values_list('id', 'semester'):
+        subjects_by_semester.setdefault(semester, []).append(subject_id)
+
+    qualified = {}
+    for subject_id, teacher_id in qualifications.values_list('subject_id', 'teacher_id'):
+        qualified.setdefault(subject_id, []).append(teacher_id)
+    return subjects_by_semester, qualified
+
+
+def load_problem():
+    """Build a Problem from the database with one query per table."""
+    days, slots = week_labels()
+    cells = _cells(Timetable.objects.values_list(*CELL_FIELDS), slots)
+    return Problem(days, slots, cells, *_subjects_and_qualifications())
+
+
+def load_repair_problem(dirty, avoid=None):
+    """
+    Build a Problem that only re-solves the ``dirty`` slots, given as
+    (semester, grade, day, time_slot) tuples. ``avoid`` optionally maps a
+    dirty slot to teacher ids that must not be put back into it.
+
+    Only the weeks of the affected divisions are loaded as cells. Their
+    other lessons may be rearranged to make room, everything else stays
+    as it is. Bookings of the qualified teachers in other divisions are
+    loaded as fixed constraints, so the work grows with the size of the
+    change rather than with the number of divisions.
+    """
+    days, slots = week_labels()
+    dirty = {(int(semester), grade, day, time_slot) for semester, grade, day, time_slot in dirty}
+    avoid = {(int(semester), grade, day, time_slot): teacher_ids
+             for (semester, grade, day, time_slot), teacher_ids in (avoid or {}).items()}
+    sections = {(semester, grade) for semester, grade, _, _ in dirty}
+    if not sections:
+        return Problem(days, slots, [], {}, {})
+
+    in_sections = Q()
+    for semester, grade in sections:
+        in_sections |= Q(semester=semester, grade=grade)
+    cells = _cells(Timetable.objects.filter(in_sections).values_list(*CELL_FIELDS), slots)
+    subjects_by_semester, qualified = _subjects_and_qualifications({semester for semester, _ in sections})
+
+    movable = []
+    avoided = {}
+    for cell in cells:
+        key = (cell.semester, cell.grade, days[cell.time // len(slots)], slots[cell.time % len(slots)])
+        if key in dirty:
+            cell.pinned = False
+            movable.append(cell.row_id)
+            if key in avoid:
+                avoided[cell.row_id] = avoid[key]
+        else:
+            cell.pinned = True
+            if cell.is_complete:
+                movable.append(cell.row_id)
+
+    # What the candidate teachers already teach elsewhere
+    teachers = {teacher_id for teacher_ids in qualified.values() for teacher_id in teacher_ids}
+    teachers.update(cell.teacher_id for cell in cells if cell.teacher_id is not None)
+    bookings = []
+    others = Timetable.objects.filter(teacher_id__in=teachers, day_number__isnull=False, slot_number__isnull=False)
+    for teacher_id, day_number, slot_number in others.exclude(in_sections).values_list(
+        'teacher_id', 'day_number', 'slot_number'
+    ):
+        bookings.append((teacher_id, day_number * len(slots) + slot_number))
+
+    return Problem(
+        days, slots, cells, subjects_by_semester, qualified, bookings=bookings, movable=movable, avoid=avoided
+    )
+
+
+def save_solution(solution, batch_size=500):
+    """
+    Write the solver's assignments back with batched UPDATEs in one
+    transaction and return how many rows changed.
+    """
+    entries = [
+        Timetable(id=row_id, subject_id=subject_id, teacher_id=teacher_id)
+        for row_id, (subject_id, teacher_id) in solution.assignments.items()
+    ]
+    with transaction.atomic():
+        Timetable.objects.bulk_update(entries, fields=['subject', 'teacher'], batch_size=batch_size)
+    return len(entries)
+
+
+def load_occupancy(teacher_ids=None):
+    """
+    Build a TeacherOccupancy from every booked Timetable row in one query,
+    or only from the rows of ``teacher_ids`` when given.
+    """
+    occupancy = TeacherOccupancy(*week_labels())
+    width = len(occupancy.slots)
+    rows = Timetable.objects.filter(teacher__isnull=False, day_number__isnull=False, slot_number__isnull=False)
+    if teacher_ids is not None:
+        rows = rows.filter(teacher_id__in=teacher_ids)
+    for teacher_id, day_number, slot_number in rows.values_list('teacher_id', 'day_number', 'slot_number'):
+        occupancy.book(teacher_id, day_number * width + slot_number)
+    return occupancy
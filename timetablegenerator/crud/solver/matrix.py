@@ -0,0 +1,207 @@
+from array import array
+from collections import Counter
+
+from django.db import transaction
+
+from crud.cache import invalidate
+from crud.models import Timetable
+
+from . import loader
+
+EMPTY = -1
+
+
+class TimetableMatrix:
+    """
+    The timetable as flat int64 arrays of subject ids and teacher ids.
+
+    Cells are laid out semester by grade by day by slot, so every section's
+    week is one contiguous run of ``week_length`` cells and the same time in
+    every section is a strided slice. Empty cells, and cells without a
+    Timetable row, hold -1. ``rows`` keeps the Timetable id of every cell so
+    changes can be written back.
+    """
+
+    def __init__(self, semesters, grades, days=None, slots=None):
+        if days is None or slots is None:
+            days, slots = loader.week_labels()
+        self.semesters = sorted(semesters)
+        self.grades = sorted(grades)
+        self.days = list(days)
+        self.slots = list(slots)
+        self.week_length = len(self.days) * len(self.slots)
+        self._semester_index = {semester: index for index, semester in enumerate(self.semesters)}
+        self._grade_index = {grade: index for index, grade in enumerate(self.grades)}
+        self._day_index = {day: index for index, day in enumerate(self.days)}
+        self._slot_index = {slot: index for index, slot in enumerate(self.slots)}
+
+        size = len(self.semesters) * len(self.grades) * self.week_length
+        self.subjects = array('q', [EMPTY]) * size
+        self.teachers = array('q', [EMPTY]) * size
+        self.rows = array('q', [EMPTY]) * size
+        self._saved_subjects = array('q', self.subjects)
+        self._saved_teachers = array('q', self.teachers)
+
+    @property
+    def shape(self):
+        return len(self.semesters), len(self.grades), len(self.days), len(self.slots)
+
+    def __len__(self):
+        return len(self.subjects)
+
+    @classmethod
+    def from_database(cls, queryset=None):
+        """Load every Timetable row, or those of ``queryset``, with one query."""
+        if queryset is None:
+            queryset = Timetable.objects.all()
+        queryset = queryset.filter(day_number__isnull=False, slot_number__isnull=False)
+        rows = list(queryset.values_list(*loader.CELL_FIELDS))
+        matrix = cls({row[1] for row in rows}, {row[2] for row in rows})
+        grades = len(matrix.grades)
+        for row_id, semester, grade, day_number, slot_number, subject_id, teacher_id in rows:
+            section = matrix._semester_index[semester] * grades + matrix._grade_index[grade]
+            index = section * matrix.week_length + day_number * len(matrix.slots) + slot_number
+            matrix.rows[index] = row_id
+            matrix.subjects[index] = EMPTY if subject_id is None else subject_id
+            matrix.teachers[index] = EMPTY if teacher_id is None else teacher_id
+        matrix._saved_subjects = array('q', matrix.subjects)
+        matrix._saved_teachers = array('q', matrix.teachers)
+        return matrix
+
+    def index(self, semester, grade, day, time_slot):
+        """Flat cell index for a slot given by its labels, or None if any label is unknown."""
+        try:
+            section = self._semester_index[semester] * len(self.grades) + self._grade_index[grade]
+            time = self._day_index[day] * len(self.slots) + self._slot_index[time_slot]
+        except KeyError:
+            return None
+        return section * self.week_length + time
+
+    def label(self, index):
+        """(semester, grade, day, time_slot) of a flat cell index."""
+        section, time = divmod(index, self.week_length)
+        semester, grade = divmod(section, len(self.grades))
+        day, slot = divmod(time, len(self.slots))
+        return self.semesters[semester], self.grades[grade], self.days[day], self.slots[slot]
+
+    def get(self, semester, grade, day, time_slot):
+        """(subject id, teacher id) of a slot, with None for empty."""
+        index = self.index(semester, grade, day, time_slot)
+        if index is None:
+            raise KeyError((semester, grade, day, time_slot))
+        subject_id, teacher_id = self.subjects[index], self.teachers[index]
+        return (None if subject_id == EMPTY else subject_id), (None if teacher_id == EMPTY else teacher_id)
+
+    def set(self, semester, grade, day, time_slot, subject_id, teacher_id):
+        index = self.index(semester, grade, day, time_slot)
+        if index is None:
+            raise KeyError((semester, grade, day, time_slot))
+        self.subjects[index] = EMPTY if subject_id is None else subject_id
+        self.teachers[index] = EMPTY if teacher_id is None else teacher_id
+
+    def apply(self, solution):
+        """Copy a solver Solution's assignments, which are keyed by Timetable id, into the matrix."""
+        index_of_row = {row_id: index for index, row_id in enumerate(self.rows) if row_id != EMPTY}
+        for row_id, (subject_id, teacher_id) in solution.assignments.items():
+            index = index_of_row[row_id]
+            self.subjects[index] = EMPTY if subject_id is None else subject_id
+            self.teachers[index] = EMPTY if teacher_id is None else teacher_id
+
+    def changed(self):
+        """Indexes of the cells that differ from what was loaded or last saved."""
+        return [
+            index for index in range(len(self.subjects))
+            if self.subjects[index] != self._saved_subjects[index] or self.teachers[index] != self._saved_teachers[index]
+        ]
+
+    def save(self, batch_size=500):
+        """
+        Write the changed cells back in one transaction and return how many
+        were written. Rows are upserted on the (semester, day, time_slot,
+        grade) key, which is a single INSERT ... ON CONFLICT statement per
+        batch and also creates cells that had no row yet. The cached grids
+        of the sections written to are invalidated.
+        """
+        changed = self.changed()
+        entries = []
+        for index in changed:
+            semester, grade, day, time_slot = self.label(index)
+            subject_id, teacher_id = self.subjects[index], self.teachers[index]
+            entries.append(Timetable(
+                semester=semester, grade=grade, day=day, time_slot=time_slot,
+                subject_id=None if subject_id == EMPTY else subject_id,
+                teacher_id=None if teacher_id == EMPTY else teacher_id,
+            ))
+        with transaction.atomic():
+            Timetable.objects.bulk_create(
+                entries,
+                batch_size=batch_size,
+                update_conflicts=True,
+                unique_fields=['semester', 'day', 'time_slot', 'grade'],
+                update_fields=['subject', 'teacher'],
+            )
+        for semester, grade in {(entry.semester, entry.grade) for entry in entries}:
+            invalidate(semester, grade)
+
+        self._saved_subjects = array('q', self.subjects)
+        self._saved_teachers = array('q', self.teachers)
+        return len(entries)
+
+    def section(self, semester, grade):
+        """(subjects, teachers) arrays of one section's week."""
+        start = (self._semester_index[semester] * len(self.grades) + self._grade_index[grade]) * self.week_length
+        end = start + self.week_length
+        return self.subjects[start:end], self.teachers[start:end]
+
+    def at_time(self, time):
+        """(subjects, teachers) arrays of every section at one flat week slot."""
+        return self.subjects[time::self.week_length], self.teachers[time::self.week_length]
+
+    def teacher_clashes(self):
+        """(teacher id, day, time_slot, sections) for every teacher booked in several sections at once."""
+        clashes = []
+        for time in range(self.week_length):
+            counts = Counter(self.teachers[time::self.week_length])
+            counts.pop(EMPTY, None)
+            for teacher_id, sections in counts.items():
+                if sections > 1:
+                    day, slot = divmod(time, len(self.slots))
+                    clashes.append((teacher_id, self.days[day], self.slots[slot], sections))
+        return clashes
+
+    def teacher_load(self):
+        """Lessons per teacher for the whole week."""
+        load = Counter(self.teachers)
+        load.pop(EMPTY, None)
+        return load
+
+    def subject_hours(self):
+        """Lessons per subject for every (semester, grade) section."""
+        hours = {}
+        for semester in self.semesters:
+            for grade in self.grades:
+                subjects, _ = self.section(semester, grade)
+                counts = Counter(subjects)
+                counts.pop(EMPTY, None)
+                hours[(semester, grade)] = counts
+        return hours
+
+    def empty_cells(self):
+        """Number of existing slots that are still missing a subject or a teacher."""
+        return sum(
+            1 for row_id, subject_id, teacher_id in zip(self.rows, self.subjects, self.teachers)
+            if row_id != EMPTY and (subject_id == EMPTY or teacher_id == EMPTY)
+        )
+
+    def to_numpy(self):
+        """
+        (subjects, teachers) as int64 NumPy arrays shaped (semesters, grades,
+        days, slots). The arrays share memory with the matrix, so writes to
+        them show up in ``save()``. NumPy is optional and only needed here.
+        """
+        import numpy
+
+        return tuple(
+            numpy.frombuffer(values, dtype=numpy.int64).reshape(self.shape)
+            for values in (self.subjects, self.teachers)
+        )
@@ -0,0 +1,41 @@
+class TeacherOccupancy:
+    """
+    Which teacher is booked when, as one int bitmask per teacher.
+
+    Bit ``day * len(slots) + slot`` is set while the teacher has a lesson in
+    that slot in any semester or grade, so a conflict check is a single
+    dict lookup and bit test.
+    """
+
+    def __init__(self, days, slots):
+        self.days = list(days)
+        self.slots = list(slots)
+        self._day_index = {day: index for index, day in enumerate(self.days)}
+        self._slot_index = {slot: index for index, slot in enumerate(self.slots)}
+        self.masks = {}
+
+    def time_of(self, day, time_slot):
+        """Flat slot index for a (day, time_slot) label pair, or None if either is unknown."""
+        if day not in self._day_index or time_slot not in self._slot_index:
+            return None
+        return self._day_index[day] * len(self.slots) + self._slot_index[time_slot]
+
+    def is_busy(self, teacher_id, time):
+        return bool(self.masks.get(teacher_id, 0) >> time & 1)
+
+    def book(self, teacher_id, time):
+        self.masks[teacher_id] = self.masks.get(teacher_id, 0) | 1 << time
+
+    def free(self, teacher_id, time):
+        mask = self.masks.get(teacher_id, 0) & ~(1 << time)
+        if mask:
+            self.masks[teacher_id] = mask
+        else:
+            self.masks.pop(teacher_id, None)
+
+    def load(self, teacher_id):
+        """Number of slots the teacher is booked for this week."""
+        return bin(self.masks.get(teacher_id, 0)).count('1')
+
+    def clear(self):
+        self.masks.clear()
@@ -0,0 +1,106 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.conf import settings
+
+from .engine import solve
+from .problem import Problem, Solution
+
+logger = logging.getLogger(__name__)
+
+
+def _find(parent, node):
+    while parent[node] != node:
+        parent[node] = parent[parent[node]]
+        node = parent[node]
+    return node
+
+
+def split_components(problem):
+    """
+    Split a Problem into independent sub-problems.
+
+    Semesters and teachers are linked when a teacher is qualified for a
+    subject of the semester or already teaches one of its slots. Each
+    connected group of semesters and teachers can be solved on its own,
+    because no teacher of one group can ever be needed by another.
+    """
+    parent = {}
+
+    def union(a, b):
+        parent.setdefault(a, a)
+        parent.setdefault(b, b)
+        root_a, root_b = _find(parent, a), _find(parent, b)
+        if root_a != root_b:
+            parent[root_b] = root_a
+
+    for cell in problem.cells:
+        parent.setdefault(('semester', cell.semester), ('semester', cell.semester))
+        if cell.teacher_id is not None:
+            union(('semester', cell.semester), ('teacher', cell.teacher_id))
+    for semester, subject_ids in problem.subjects_by_semester.items():
+        for subject_id in subject_ids:
+            for teacher_id in problem.qualified.get(subject_id, ()):
+                union(('semester', semester), ('teacher', teacher_id))
+
+    semesters_by_root = {}
+    teachers_by_root = {}
+    for node in parent:
+        kind, value = node
+        group = semesters_by_root if kind == 'semester' else teachers_by_root
+        group.setdefault(_find(parent, node), set()).add(value)
+
+    components = []
+    for root, semesters in semesters_by_root.items():
+        cells = [cell for cell in problem.cells if cell.semester in semesters]
+        subjects_by_semester = {
+            semester: ids for semester, ids in problem.subjects_by_semester.items() if semester in semesters
+        }
+        subject_ids = {subject_id for ids in subjects_by_semester.values() for subject_id in ids}
+        row_ids = {cell.row_id for cell in cells}
+        teachers = teachers_by_root.get(root, set())
+        components.append(Problem(
+            problem.days,
+            problem.slots,
+            cells,
+            subjects_by_semester,
+            {subject_id: ids for subject_id, ids in problem.qualified.items() if subject_id in subject_ids},
+            bookings=[(teacher_id, time) for teacher_id, time in problem.bookings if teacher_id in teachers],
+            movable=None if problem.movable is None else problem.movable & row_ids,
+            avoid={row_id: ids for row_id, ids in problem.avoid.items() if row_id in row_ids},
+        ))
+    return components
+
+
+def solve_in_parallel(problem, workers=None, min_cells=None, progress=None):
+    """
+    Solve the independent components of a Problem on a process pool and
+    merge their solutions. Small problems, or problems that don't split,
+    are solved in this process since starting workers would cost more.
+    ``progress`` is called with the number of cells filled so far.
+    """
+    if workers is None:
+        workers = getattr(settings, 'TIMETABLE_SOLVER_WORKERS', None) or os.cpu_count() or 1
+    if min_cells is None:
+        min_cells = getattr(settings, 'TIMETABLE_SOLVER_PARALLEL_MIN_CELLS', 2000)
+
+    components = split_components(problem)
+    if workers < 2 or len(components) < 2 or len(problem.cells) < min_cells:
+        return solve(problem, progress)
+
+    # Biggest components first so one large department doesn't finish last
+    components.sort(key=lambda component: len(component.cells), reverse=True)
+    logger.info(f"Solving {len(components)} components on {min(workers, len(components))} processes")
+    # Workers set Django up themselves in case they are spawned rather than forked
+    merged = Solution()
+    with ProcessPoolExecutor(max_workers=min(workers, len(components)), initializer=django.setup) as pool:
+        for future in as_completed([pool.submit(solve, component) for component in components]):
+            solution = future.result()
+            merged.assignments.update(solution.assignments)
+            merged.unsatisfied.extend(solution.unsatisfied)
+            merged.filled += solution.filled
+            if progress:
+                progress(merged.filled)
+    return merged
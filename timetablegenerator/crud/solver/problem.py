@@ -0,0 +1,81 @@
+class Cell:
+    """One (semester, grade, day, slot) row of the timetable as the solver sees it."""
+
+    __slots__ = ('row_id', 'semester', 'grade', 'time', 'subject_id', 'teacher_id', 'pinned')
+
+    def __init__(self, row_id, semester, grade, time, subject_id=None, teacher_id=None):
+        self.row_id = row_id
+        self.semester = semester
+        self.grade = grade
+        # time is the flat index day * len(slots) + slot
+        self.time = time
+        self.subject_id = subject_id
+        self.teacher_id = teacher_id
+        # Anything already filled in by an admin is kept as it is
+        self.pinned = subject_id is not None and teacher_id is not None
+
+    @property
+    def section(self):
+        return (self.semester, self.grade)
+
+    @property
+    def is_complete(self):
+        return self.subject_id is not None and self.teacher_id is not None
+
+
+class Problem:
+    """
+    In-memory model of the week: every Timetable row as a Cell, the subjects
+    taught in each semester and the teachers qualified for each subject.
+
+    It holds plain ints and strings only, so it can be built from the
+    database once and handed to the engine without touching the ORM again.
+    """
+
+    def __init__(self, days, slots, cells, subjects_by_semester, qualified, bookings=(), movable=None, avoid=None):
+        self.days = list(days)
+        self.slots = list(slots)
+        self.cells = list(cells)
+        # {semester: [subject_id, ...]}
+        self.subjects_by_semester = {sem: sorted(ids) for sem, ids in subjects_by_semester.items()}
+        # {subject_id: [teacher_id, ...]}
+        self.qualified = {sub: sorted(ids) for sub, ids in qualified.items()}
+        # [(teacher_id, time)] booked in rows that are not part of this problem
+        self.bookings = list(bookings)
+        # Row ids the repair pass may rearrange; None means the cells that start out empty
+        self.movable = None if movable is None else set(movable)
+        # {row_id: {teacher_id, ...}} teachers that must not be put back into a row
+        self.avoid = {row_id: set(teacher_ids) for row_id, teacher_ids in (avoid or {}).items()}
+
+    @property
+    def week_length(self):
+        return len(self.days) * len(self.slots)
+
+    def label(self, time):
+        day, slot = divmod(time, len(self.slots))
+        return self.days[day], self.slots[slot]
+
+    def sections(self):
+        """Group the cells by (semester, grade), each section ordered by time."""
+        sections = {}
+        for cell in self.cells:
+            sections.setdefault(cell.section, []).append(cell)
+        for cells in sections.values():
+            cells.sort(key=lambda cell: cell.time)
+        return sections
+
+
+class Solution:
+    """What the engine decided, plus everything it could not satisfy."""
+
+    def __init__(self):
+        # {row_id: (subject_id, teacher_id)} for the rows the solver filled
+        self.assignments = {}
+        # One dict per problem, ready to be returned by the API
+        self.unsatisfied = []
+        # Number of open cells that ended up with both a subject and a teacher
+        self.filled = 0
+
+    @property
+    def is_complete(self):
+        return not self.unsatisfied
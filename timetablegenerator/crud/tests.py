@@ -1,3 +1,761 @@
-from django.test import TestCase
+import datetime
+import os
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, transaction
+from django.db.models import Count, Q
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from api.models import CustomUser
+from api.tokens import ClaimsRefreshToken
+from . import async_views
+from .benchmark import run_benchmark
+from .jobs import claim_next_job, run_worker
+from .management.commands.generate_timetable import generate_timetable
+from .models import GenerationJob, Subjects, Teacher_Subject, Teachers, Timetable
+from .operations import populate_timetable
+from .rendering import dumps, grid_rows
+from .serializers import TimetableSerializer
+from .solver import TimetableMatrix, load_occupancy, load_problem, solve, solve_in_parallel, split_components
 
 # Create your tests here.
+
+
+class GetTimetableBySemesterTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_user(email="student@example.com", password="pw"))
+        generate_timetable({3: ['A', 'B']})
+
+    def fill(self, grade, count):
+        teacher = Teachers.objects.create(name="Teacher", phone_number="1")
+        for index, entry in enumerate(Timetable.objects.filter(semester=3, grade=grade)[:count]):
+            entry.subject = Subjects.objects.create(semester=3, name=f"Subject {index}", subject_code=f"S{index}")
+            entry.teacher = teacher
+            entry.save()
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.fill('A', 2)
+        self.fill('B', 35)
+        for grade in ('A', 'B'):
+            with self.assertNumQueries(1):
+                response = self.client.get('/api/get_timetable_by_semester/', {'semester': 3, 'grade': grade})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()), 35)
+
+    def test_entries_are_in_week_order(self):
+        response = self.client.get('/api/get_timetable_by_semester/', {'semester': 3, 'grade': 'A'})
+        expected = [(day, slot) for day, _ in Timetable.DAY_CHOICES for slot, _ in Timetable.TIME_SLOTS]
+        self.assertEqual([(row['day'], row['time_slot']) for row in response.json()], expected)
+
+    def test_fast_rows_match_timetable_serializer(self):
+        self.fill('A', 3)
+        Teachers.objects.update(name="Zoë\u2028Ñ")
+        entries = Timetable.objects.filter(semester=3, grade='A')
+        expected = JSONRenderer().render(TimetableSerializer(entries.with_related().in_week_order(), many=True).data)
+        self.assertEqual(dumps(grid_rows(entries.in_week_order())), expected)
+        with mock.patch('crud.rendering.orjson', None):
+            self.assertEqual(dumps(grid_rows(entries.in_week_order())), expected)
+
+    def test_missing_division_is_404(self):
+        response = self.client.get('/api/get_timetable_by_semester/', {'semester': 4, 'grade': 'A'})
+        self.assertEqual(response.status_code, 404)
+
+
+class GridLayoutTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_user(email="student@example.com", password="pw"))
+        generate_timetable({3: ['A', 'B']})
+        teacher = Teachers.objects.create(name="Teacher", phone_number="1")
+        self.subject = Subjects.objects.create(semester=3, name="Maths", subject_code="M1")
+        Timetable.objects.filter(semester=3, day='Tuesday').update(subject=self.subject, teacher=teacher)
+
+    def test_grid_references_lookup_tables(self):
+        response = self.client.get('/api/get_timetable_by_semester/', {'semester': 3, 'grade': 'A', 'layout': 'grid'})
+        body = response.json()
+        self.assertEqual(body["subjects"], [{"id": self.subject.id, "name": "Maths"}])
+        self.assertEqual(len(body["teachers"]), 1)
+        [division] = body["divisions"]
+        self.assertEqual(division["grid"][0], [None] * 7)
+        self.assertEqual(division["grid"][1], [[0, 0]] * 7)
+
+        listed = self.client.get('/api/get_timetable_by_semester/', {'semester': 3, 'grade': 'A'})
+        self.assertLess(len(response.content) * 4, len(listed.content))
+
+        with self.assertNumQueries(0):
+            cached = self.client.get('/api/get_timetable_by_semester/', {'semester': 3, 'grade': 'A', 'layout': 'grid'})
+        self.assertEqual(cached.content, response.content)
+
+    def test_several_divisions_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/get_timetable_by_semester/', {'layout': 'grid', 'divisions': '3:A,3:B,4:A'})
+        body = response.json()
+        self.assertEqual([(d["semester"], d["grade"]) for d in body["divisions"]], [(3, 'A'), (3, 'B')])
+        self.assertEqual(len(body["subjects"]), 1)
+
+
+class TimetableGridCacheTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_superuser(email="admin@example.com", password="pw"))
+        generate_timetable({3: ['A']})
+        self.params = {'semester': 3, 'grade': 'A'}
+
+    def test_unchanged_grid_is_served_from_cache(self):
+        first = self.client.get('/api/get_timetable_by_semester/', self.params)
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/get_timetable_by_semester/', self.params)
+            not_modified = self.client.get(
+                '/api/get_timetable_by_semester/', self.params, HTTP_IF_NONE_MATCH=first['ETag']
+            )
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_mutation_invalidates_grid(self):
+        first = self.client.get('/api/get_timetable_by_semester/', self.params)
+        subject = Subjects.objects.create(semester=3, name="Compilers", subject_code="CS301")
+        teacher = Teachers.objects.create(name="Teacher", phone_number="1")
+        self.client.post('/api/add_teacher_and_subject/', {
+            'semester': 3, 'grade': 'A', 'day': 'Monday', 'time_slot': '09:00-09:50',
+            'subject_id': subject.id, 'teacher_id': teacher.id,
+        }, format='json')
+        second = self.client.get('/api/get_timetable_by_semester/', self.params, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json()[0]['subject'], "Compilers")
+
+
+class GenerationJobTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_superuser(email="admin@example.com", password="pw"))
+        generate_timetable({3: ['A']})
+        subject = Subjects.objects.create(semester=3, name="Maths", subject_code="M1")
+        teacher = Teachers.objects.create(name="Teacher", phone_number="1")
+        Teacher_Subject.objects.create(teacher=teacher, subject=subject, assigned_date="2024-01-01")
+
+    def test_async_populate_is_queued_and_run_by_worker(self):
+        response = self.client.post('/api/populate-timetable/', {"async": True}, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(Timetable.objects.exclude(teacher=None).exists())
+
+        run_worker(once=True)
+
+        job = self.client.get(response.json()["status_url"]).json()
+        self.assertEqual(job["status"], "done")
+        self.assertEqual(job["slots_filled"], job["slots_total"])
+        self.assertEqual(job["updated"], 35)
+        self.assertFalse(Timetable.objects.filter(teacher=None).exists())
+
+    def test_failed_job_records_error(self):
+        job = GenerationJob.objects.create(kind='rebuild')
+        run_worker(once=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertTrue(job.error)
+
+    def test_repair_job_keeps_the_teachers_to_avoid(self):
+        slot = {'semester': 3, 'grade': 'A', 'day': 'Monday', 'time_slot': '09:00-09:50'}
+        response = self.client.post('/api/generation-jobs/', {
+            'kind': 'repair', 'slots': [{**slot, 'avoid_teacher_ids': [7, 5]}],
+        }, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(GenerationJob.objects.get(pk=response.json()["job_id"]).payload["avoid"], [
+            {"slot": [3, 'A', 'Monday', '09:00-09:50'], "teacher_ids": [5, 7]},
+        ])
+
+    def test_jobs_are_for_admins_only(self):
+        self.client.force_authenticate(CustomUser.objects.create_user(email="student@example.com", password="pw"))
+        self.assertEqual(self.client.post('/api/generation-jobs/', {'kind': 'clear'}, format='json').status_code, 403)
+        for url in ('/api/populate-timetable/', '/api/remove_all_teacher_subject/'):
+            self.assertEqual(self.client.post(url, {'async': True}, format='json').status_code, 403)
+        self.assertFalse(GenerationJob.objects.exists())
+
+    @override_settings(TIMETABLE_JOB_STALE_AFTER=60, TIMETABLE_JOB_MAX_ATTEMPTS=2)
+    def test_jobs_of_a_dead_worker_are_taken_back(self):
+        long_ago = timezone.now() - datetime.timedelta(minutes=5)
+        retried = GenerationJob.objects.create(kind='clear', status='running', heartbeat_at=long_ago, attempts=1)
+        exhausted = GenerationJob.objects.create(kind='clear', status='running', heartbeat_at=long_ago, attempts=2)
+        alive = GenerationJob.objects.create(kind='clear', status='running', heartbeat_at=timezone.now(), attempts=1)
+
+        self.assertEqual(claim_next_job().pk, retried.pk)
+
+        retried.refresh_from_db()
+        exhausted.refresh_from_db()
+        alive.refresh_from_db()
+        self.assertEqual((retried.status, retried.attempts), ('running', 2))
+        self.assertEqual(exhausted.status, 'failed')
+        self.assertEqual(alive.status, 'running')
+
+    def test_worker_refuses_a_cache_it_cannot_share_with_the_web_server(self):
+        with self.assertRaises(CommandError):
+            call_command('run_generation_worker', once=True)
+
+
+class TeacherConflictTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_user(email="student@example.com", password="pw"))
+        generate_timetable({3: ['A', 'B']})
+        self.teacher = Teachers.objects.create(name="Teacher", phone_number="1")
+        self.subject = Subjects.objects.create(semester=3, name="Maths", subject_code="M1")
+        self.slot = {'semester': 3, 'day': 'Monday', 'time_slot': '09:00-09:50'}
+
+    def test_booking_in_another_division_is_a_conflict(self):
+        Timetable.objects.filter(grade='A', **self.slot).update(subject=self.subject, teacher=self.teacher)
+
+        response = self.client.post('/api/add_teacher_and_subject/', {
+            **self.slot, 'grade': 'B', 'subject_id': self.subject.id, 'teacher_id': self.teacher.id,
+        }, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertIsNone(Timetable.objects.get(grade='B', **self.slot).teacher_id)
+
+    def test_refused_booking_creates_no_slot(self):
+        Timetable.objects.filter(grade='A', **self.slot).update(subject=self.subject, teacher=self.teacher)
+
+        response = self.client.post('/api/add_teacher_and_subject/', {
+            **self.slot, 'grade': 'C', 'subject_id': self.subject.id, 'teacher_id': self.teacher.id,
+        }, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Timetable.objects.filter(grade='C').exists())
+
+    def test_booking_a_new_slot_creates_it(self):
+        response = self.client.post('/api/add_teacher_and_subject/', {
+            **self.slot, 'grade': 'C', 'subject_id': self.subject.id, 'teacher_id': self.teacher.id,
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Timetable.objects.get(grade='C', **self.slot).teacher_id, self.teacher.id)
+
+
+class BulkTimetableEditTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_superuser(email="admin@example.com", password="pw"))
+        generate_timetable({3: ['A', 'B']})
+        self.teacher = Teachers.objects.create(name="Teacher", phone_number="1")
+        self.subject = Subjects.objects.create(semester=3, name="Maths", subject_code="M1")
+
+    def assign(self, grade, day, time_slot, **ids):
+        return {'semester': 3, 'grade': grade, 'day': day, 'time_slot': time_slot, **ids}
+
+    def test_batch_is_all_or_nothing(self):
+        response = self.client.patch('/api/timetable/bulk/', [
+            self.assign('A', 'Monday', '09:00-09:50', subject_id=self.subject.id, teacher_id=self.teacher.id),
+            self.assign('A', 'Monday', '09:50-10:40', subject_id=self.subject.id + 100),
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([result["status"] for result in response.json()["results"]], ["ok", "error"])
+        self.assertFalse(Timetable.objects.filter(teacher__isnull=False).exists())
+
+    def test_teacher_clash_rejects_the_batch(self):
+        Timetable.objects.filter(semester=3, grade='B', day='Monday', time_slot='09:00-09:50').update(teacher=self.teacher)
+        response = self.client.patch('/api/timetable/bulk/', [
+            self.assign('A', 'Monday', '09:50-10:40', teacher_id=self.teacher.id),
+            self.assign('A', 'Monday', '09:00-09:50', teacher_id=self.teacher.id),
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("already assigned", response.json()["results"][1]["error"])
+        self.assertEqual(Timetable.objects.filter(teacher=self.teacher).count(), 1)
+
+    def test_teachers_are_locked_before_their_bookings_are_read(self):
+        with mock.patch('crud.views._lock_teachers') as lock_teachers, \
+                mock.patch('crud.views.load_occupancy', wraps=load_occupancy) as occupancy:
+            lock_teachers.side_effect = lambda ids: self.assertFalse(occupancy.called)
+            response = self.client.patch('/api/timetable/bulk/', [
+                self.assign('A', 'Monday', '09:00-09:50', teacher_id=self.teacher.id),
+            ], format='json')
+        self.assertEqual(response.status_code, 200)
+        lock_teachers.assert_called_once_with([self.teacher.id])
+
+    def test_edits_only_lock_and_save_the_named_cells(self):
+        operations = [
+            self.assign('A', 'Monday', '09:00-09:50', subject_id=self.subject.id),
+            self.assign('B', 'Tuesday', '09:50-10:40', teacher_id=self.teacher.id),
+        ]
+        response = self.client.patch('/api/timetable/bulk/', operations, format='json')
+        self.assertEqual(response.json()["updated"], 2)
+        self.assertEqual(Timetable.objects.filter(Q(subject__isnull=False) | Q(teacher__isnull=False)).count(), 2)
+
+    def test_booleans_are_not_ids(self):
+        response = self.client.patch(
+            '/api/timetable/bulk/', [self.assign('A', 'Monday', '09:00-09:50', teacher_id=True)], format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("teacher_id", response.json()["results"][0]["error"])
+
+    def test_admins_only(self):
+        self.client.force_authenticate(CustomUser.objects.create_user(email="student@example.com", password="pw"))
+        response = self.client.patch('/api/timetable/bulk/', [], format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+def staff_department(semesters, subjects_per_semester=3, teachers=6):
+    """Subjects for ``semesters`` and teachers each qualified for two thirds of them."""
+    subjects = [
+        Subjects.objects.create(semester=semester, name=f"Subject {semester}-{index}", subject_code=f"S{semester}{index}")
+        for semester in semesters for index in range(subjects_per_semester)
+    ]
+    staff = [Teachers.objects.create(name=f"Teacher {index}", phone_number=str(index)) for index in range(teachers)]
+    for index, teacher in enumerate(staff):
+        for subject in subjects[index % 3::3] + subjects[(index + 1) % 3::3]:
+            Teacher_Subject.objects.create(teacher=teacher, subject=subject, assigned_date=datetime.date(2025, 1, 6))
+    return subjects, staff
+
+
+def double_bookings():
+    """(teacher, day, time_slot) booked in more than one division."""
+    return list(
+        Timetable.objects.filter(teacher__isnull=False).values('teacher', 'day', 'time_slot')
+        .annotate(lessons=Count('id')).filter(lessons__gt=1)
+    )
+
+
+def unqualified_lessons():
+    qualified = set(Teacher_Subject.objects.values_list('teacher_id', 'subject_id'))
+    lessons = Timetable.objects.filter(teacher__isnull=False).values_list('teacher_id', 'subject_id')
+    return [lesson for lesson in lessons if lesson not in qualified]
+
+
+class PopulateTimetableTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_superuser(email="admin@example.com", password="pw"))
+        generate_timetable({3: ['A', 'B', 'C'], 4: ['A', 'B']})
+        self.subjects, self.staff = staff_department([3, 4])
+
+    def test_every_slot_gets_a_qualified_teacher_booked_once(self):
+        response = self.client.post('/api/populate-timetable/', format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Timetable.objects.filter(teacher=None).exists())
+        self.assertEqual(double_bookings(), [])
+        self.assertEqual(unqualified_lessons(), [])
+
+    def test_slots_nobody_can_teach_are_left_empty(self):
+        # One teacher for semester 3's subjects cannot cover three divisions at once
+        Teacher_Subject.objects.filter(subject__semester=3).exclude(teacher=self.staff[0]).delete()
+
+        populate_timetable()
+
+        self.assertEqual(double_bookings(), [])
+        self.assertEqual(unqualified_lessons(), [])
+        self.assertTrue(Timetable.objects.filter(semester=3, teacher=None).exists())
+
+
+class RepairTimetableTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_superuser(email="admin@example.com", password="pw"))
+        generate_timetable({3: ['A', 'B'], 4: ['A']})
+        staff_department([3, 4])
+        populate_timetable()
+        self.slot = {'semester': 3, 'grade': 'A', 'day': 'Monday', 'time_slot': '09:00-09:50'}
+
+    def cells(self, **filters):
+        return {
+            (row.semester, row.grade, row.day, row.time_slot): (row.subject_id, row.teacher_id)
+            for row in Timetable.objects.filter(**filters)
+        }
+
+    def test_repair_only_changes_the_dirty_division_and_avoids_the_removed_teacher(self):
+        removed = Timetable.objects.get(**self.slot).teacher_id
+        Timetable.objects.filter(**self.slot).update(teacher=None)
+        untouched = {**self.cells(semester=3, grade='B'), **self.cells(semester=4)}
+
+        response = self.client.post('/api/repair-timetable/', {
+            'slots': [{**self.slot, 'avoid_teacher_ids': [removed]}],
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        repaired = Timetable.objects.get(**self.slot)
+        self.assertIsNotNone(repaired.teacher_id)
+        self.assertNotEqual(repaired.teacher_id, removed)
+        self.assertEqual({**self.cells(semester=3, grade='B'), **self.cells(semester=4)}, untouched)
+        self.assertEqual(double_bookings(), [])
+        self.assertEqual(unqualified_lessons(), [])
+
+    def test_incomplete_cells_outside_the_dirty_slots_stay_as_they_are(self):
+        other = {**self.slot, 'time_slot': '09:50-10:40'}
+        Timetable.objects.filter(**other).update(subject=None, teacher=None)
+        Timetable.objects.filter(**self.slot).update(subject=None, teacher=None)
+
+        self.client.post('/api/repair-timetable/', {'slots': [self.slot]}, format='json')
+
+        self.assertIsNotNone(Timetable.objects.get(**self.slot).teacher_id)
+        self.assertEqual(self.cells(**other), {(3, 'A', 'Monday', '09:50-10:40'): (None, None)})
+
+    def test_admins_only(self):
+        self.client.force_authenticate(CustomUser.objects.create_user(email="student@example.com", password="pw"))
+        response = self.client.post('/api/repair-timetable/', {'slots': [self.slot]}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_removing_a_teacher_repairs_for_admins_only(self):
+        self.client.force_authenticate(CustomUser.objects.create_user(email="student@example.com", password="pw"))
+        before = self.cells(semester=3, grade='A')
+        response = self.client.post('/api/remove_teacher/', {**self.slot, 'repair': True}, format='json')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.cells(semester=3, grade='A'), before)
+
+
+class TeacherScheduleTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_user(email="teacher@example.com", password="pw"))
+        generate_timetable({3: ['A', 'B'], 4: ['A']})
+        self.teacher = Teachers.objects.create(name="Teacher", phone_number="1")
+        self.subject = Subjects.objects.create(semester=3, name="Maths", subject_code="M1")
+        Timetable.objects.filter(semester=3, grade='B', day='Tuesday', time_slot='09:50-10:40').update(
+            subject=self.subject, teacher=self.teacher
+        )
+        Timetable.objects.filter(semester=4, day='Tuesday', time_slot='03:05-04:00').update(teacher=self.teacher)
+
+    def test_schedule_grid_and_load(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/teachers/{self.teacher.id}/schedule/')
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual((len(body["grid"]), len(body["grid"][0])), (5, 7))
+        self.assertEqual(body["grid"][1][1], {
+            "semester": 3, "grade": 'B', "subject_id": self.subject.id, "subject": "Maths", "subject_code": "M1",
+        })
+        self.assertEqual(body["grid"][1][6]["semester"], 4)
+        self.assertEqual(body["hours_per_day"]["Tuesday"], 2)
+        self.assertEqual(body["total_hours"], 2)
+
+    def test_unknown_teacher_is_404(self):
+        self.assertEqual(self.client.get('/api/teachers/999/schedule/').status_code, 404)
+
+
+class ExportTimetableTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_superuser(email="admin@example.com", password="pw"))
+        generate_timetable({3: ['A', 'B'], 4: ['A']})
+        self.teacher = Teachers.objects.create(name="Teacher", phone_number="1")
+        subject = Subjects.objects.create(semester=3, name="Maths, Applied", subject_code="M1")
+        Timetable.objects.filter(semester=3, grade='B', day='Tuesday', time_slot='01:15-02:05').update(
+            subject=subject, teacher=self.teacher
+        )
+
+    def test_csv_streams_every_slot(self):
+        response = self.client.get('/api/export/timetable.csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'semester,grade,day,time_slot,subject_code,subject,teacher')
+        self.assertEqual(len(lines), 1 + 3 * 35)
+        self.assertIn('3,B,Tuesday,01:15-02:05,M1,"Maths, Applied",Teacher', lines)
+
+    def test_teacher_ics_feed(self):
+        response = self.client.get('/api/export/timetable.ics', {'teacher': self.teacher.id})
+        body = b''.join(response.streaming_content).decode()
+        self.assertEqual(body.count('BEGIN:VEVENT'), 1)
+        self.assertIn('SUMMARY:Maths\\, Applied\r\n', body)
+        self.assertRegex(body, r'DTSTART:\d{8}T131500\r\n')
+        self.assertTrue(body.endswith('END:VCALENDAR\r\n'))
+
+    def test_unknown_format_is_404(self):
+        self.assertEqual(self.client.get('/api/export/timetable.pdf').status_code, 404)
+        self.assertEqual(self.client.get('/api/export/timetable.xlsx').status_code, 404)
+
+
+class ImportRecordsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_superuser(email="admin@example.com", password="pw"))
+        Teachers.objects.create(name="Old name", phone_number="100", department="CS")
+
+    def upload(self, kind, name, content):
+        return self.client.post(f'/api/import/{kind}/', {'file': SimpleUploadedFile(name, content.encode())})
+
+    def test_csv_upserts_teachers_and_reports_bad_rows(self):
+        response = self.upload('teachers', 'teachers.csv', (
+            "name,phone_number,department\n"
+            "New name,100,CS\n"
+            "Second,200,EE\n"
+            ",300,EE\n"
+        ))
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertEqual((report["created"], report["updated"], report["skipped"]), (1, 1, 1))
+        self.assertEqual(report["errors"], [{"row": 3, "errors": {"name": "This field is required."}}])
+        self.assertEqual(Teachers.objects.get(phone_number="100").name, "New name")
+
+    def test_qualifications_resolve_references_in_few_queries(self):
+        self.upload('subjects', 'subjects.jsonl', '{"subject_code": "M1", "name": "Maths", "semester": 3}\n')
+        rows = "".join(f'{{"teacher": "100", "subject": "M1", "assigned_date": "2024-0{month}-01"}}\n' for month in (1, 2))
+        with self.assertNumQueries(6):  # savepoint, 3 key lookups, upsert, release
+            report = self.upload('qualifications', 'pairs.jsonl', rows + '{"teacher": "999", "subject": "M1"}\n').json()
+        self.assertEqual((report["created"], report["updated"], report["skipped"]), (1, 0, 1))
+        self.assertEqual(str(Teacher_Subject.objects.get().assigned_date), "2024-02-01")
+
+    def test_json_body(self):
+        records = [{"subject_code": "P1", "name": "Physics", "semester": 4}]
+        response = self.client.post('/api/import/subjects/', records, format='json')
+        self.assertEqual(response.json()["created"], 1)
+
+
+class AdminListTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_superuser(email="admin@example.com", password="pw"))
+        subjects = [
+            Subjects.objects.create(semester=3 + index % 2, name=f"S{index}", subject_code=f"S{index}")
+            for index in range(4)
+        ]
+        for index in range(6):
+            department = "CS" if index % 2 else "EE"
+            teacher = Teachers.objects.create(name=f"T{index}", phone_number=str(index), department=department)
+            for subject in subjects[:index % 3 + 1]:
+                Teacher_Subject.objects.create(teacher=teacher, subject=subject, assigned_date="2024-01-01")
+
+    def test_plain_list_is_unchanged_and_query_count_fixed(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/teachers/')
+        self.assertEqual(len(response.json()), 6)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/teachers/', {'expand': 'subjects', 'department': 'CS'})
+        self.assertEqual([len(teacher["subjects"]) for teacher in response.json()], [2, 1, 3])
+        self.assertEqual(set(response.json()[0]["subjects"][0]), {"id", "name", "subject_code", "semester"})
+
+    def test_cursor_pages_and_sparse_fields(self):
+        response = self.client.get('/api/subjects/', {'page_size': 3, 'fields': 'id,name'})
+        page = response.json()
+        self.assertEqual([set(row) for row in page["results"]], [{"id", "name"}] * 3)
+        second = self.client.get(page["next"]).json()
+        self.assertEqual(len(second["results"]), 1)
+        self.assertIsNone(second["next"])
+
+    def test_assignment_filters(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/teachers/assign/', {'semester': 4, 'expand': 'teacher,subject'})
+        rows = response.json()
+        self.assertEqual(len(rows), 4)
+        self.assertEqual({row["subject"]["semester"] for row in rows}, {4})
+        self.assertEqual(self.client.get('/api/subjects/', {'semester': 'x'}).status_code, 400)
+
+
+class TimetableMatrixTests(TestCase):
+    def setUp(self):
+        generate_timetable({3: ['A', 'B'], 4: ['A']})
+        self.subject = Subjects.objects.create(semester=3, name="Maths", subject_code="M1")
+        self.teacher = Teachers.objects.create(name="Teacher", phone_number="1")
+
+    def test_round_trip_with_one_query_and_one_write(self):
+        with self.assertNumQueries(1):
+            matrix = TimetableMatrix.from_database()
+        self.assertEqual(matrix.shape, (2, 2, 5, 7))
+        self.assertEqual(matrix.empty_cells(), 105)
+
+        matrix.set(3, 'A', 'Monday', '09:00-09:50', self.subject.id, self.teacher.id)
+        matrix.set(3, 'B', 'Monday', '09:00-09:50', self.subject.id, self.teacher.id)
+        self.assertEqual(matrix.teacher_clashes(), [(self.teacher.id, 'Monday', '09:00-09:50', 2)])
+        self.assertEqual(matrix.subject_hours()[(3, 'A')], {self.subject.id: 1})
+
+        with self.assertNumQueries(3):  # savepoint, upsert, release
+            self.assertEqual(matrix.save(), 2)
+        entry = Timetable.objects.get(semester=3, grade='B', day='Monday', time_slot='09:00-09:50')
+        self.assertEqual((entry.subject_id, entry.teacher_id), (self.subject.id, self.teacher.id))
+        self.assertEqual(TimetableMatrix.from_database().teacher_load(), {self.teacher.id: 2})
+
+    def test_ids_beyond_32_bits_round_trip(self):
+        # DEFAULT_AUTO_FIELD is BigAutoField
+        teacher = Teachers.objects.create(id=2 ** 31 + 5, name="Big", phone_number="2")
+        Timetable.objects.filter(semester=3, grade='A', day='Monday', time_slot='09:00-09:50').update(
+            subject=self.subject, teacher=teacher
+        )
+        matrix = TimetableMatrix.from_database()
+        self.assertEqual(matrix.get(3, 'A', 'Monday', '09:00-09:50'), (self.subject.id, teacher.id))
+
+        matrix.set(3, 'B', 'Monday', '09:00-09:50', self.subject.id, teacher.id)
+        matrix.save()
+        self.assertEqual(Timetable.objects.filter(teacher=teacher).count(), 2)
+
+    def test_save_invalidates_the_cached_grids_it_changes(self):
+        self.addCleanup(caches['default'].clear)
+        client = APIClient()
+        client.force_authenticate(CustomUser.objects.create_user(email="student@example.com", password="pw"))
+        params = {'semester': 3, 'grade': 'A'}
+        self.assertIsNone(client.get('/api/get_timetable_by_semester/', params).json()[0]['teacher'])
+
+        matrix = TimetableMatrix.from_database()
+        matrix.set(3, 'A', 'Monday', '09:00-09:50', self.subject.id, self.teacher.id)
+        matrix.save()
+
+        self.assertEqual(client.get('/api/get_timetable_by_semester/', params).json()[0]['teacher'], "Teacher")
+
+
+class ParallelSolverTests(TestCase):
+    def setUp(self):
+        # Two departments that share no teachers: semesters 3 and 4, and semester 5
+        generate_timetable({3: ['A', 'B'], 4: ['A'], 5: ['A', 'B']})
+        for semester, first_teacher in ((3, 0), (4, 0), (5, 3)):
+            for index in range(3):
+                subject = Subjects.objects.create(
+                    semester=semester, name=f"Subject {semester}-{index}", subject_code=f"S{semester}{index}"
+                )
+                for number in range(first_teacher, first_teacher + 3):
+                    teacher, _ = Teachers.objects.get_or_create(name=f"Teacher {number}", phone_number=str(number))
+                    Teacher_Subject.objects.create(teacher=teacher, subject=subject, assigned_date=datetime.date(2025, 1, 6))
+
+    def test_departments_without_shared_teachers_are_separate_components(self):
+        components = split_components(load_problem())
+        self.assertEqual(
+            sorted(sorted({cell.semester for cell in component.cells}) for component in components), [[3, 4], [5]]
+        )
+        for component in components:
+            teachers = {teacher for ids in component.qualified.values() for teacher in ids}
+            semesters = {cell.semester for cell in component.cells}
+            self.assertEqual(len(component.cells), 35 * (3 if semesters == {3, 4} else 2))
+            self.assertEqual(len(teachers), 3)
+
+    def test_parallel_solution_matches_the_serial_one(self):
+        serial = solve(load_problem())
+        with mock.patch('crud.solver.parallel.ProcessPoolExecutor', wraps=ProcessPoolExecutor) as pool:
+            parallel = solve_in_parallel(load_problem(), workers=2, min_cells=0)
+        pool.assert_called_once()
+        self.assertGreater(serial.filled, 0)
+        self.assertEqual(parallel.assignments, serial.assignments)
+        self.assertEqual(parallel.filled, serial.filled)
+        self.assertEqual(sorted(map(repr, parallel.unsatisfied)), sorted(map(repr, serial.unsatisfied)))
+
+
+class BenchmarkSmokeTests(TestCase):
+    def test_benchmark_reports_every_case(self):
+        report = run_benchmark([(12, 1)], semesters=[3], subjects_per_semester=4, trace_memory=False)
+        [run] = report["runs"]
+        self.assertEqual(run["slots"], 35)
+        self.assertEqual(
+            set(run["results"]),
+            {"generate_timetable", "solve", "solve_parallel", "populate", "matrix_analytics",
+             "serialize_drf", "serialize_fast", "read_cold", "read_warm", "bulk_edit", "repair"},
+        )
+        self.assertEqual(run["results"]["read_warm"]["queries"], 0)
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', "SQLite profile")
+class SQLiteConcurrencyTests(unittest.TestCase):
+    """
+    Parallel writers on a file database opened with the settings' SQLite options.
+    A plain unittest case, as Django's test cases refuse connections from threads.
+    """
+
+    alias = 'concurrency'
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        connections.settings[self.alias] = {
+            **connection.settings_dict, 'NAME': os.path.join(directory.name, 'concurrency.sqlite3'), 'TEST': {},
+        }
+        self.addCleanup(connections.settings.pop, self.alias)
+        self.addCleanup(lambda: connections[self.alias].close())
+        with connections[self.alias].schema_editor() as editor:
+            editor.create_model(Teachers)
+
+    def test_parallel_read_then_write_transactions_do_not_lock(self):
+        errors = []
+
+        def writer(worker):
+            try:
+                for n in range(20):
+                    # Reading before writing is what fails at once in a deferred transaction
+                    with transaction.atomic(using=self.alias):
+                        count = Teachers.objects.using(self.alias).count()
+                        Teachers.objects.using(self.alias).create(name=f"T{worker}-{n}", phone_number=str(count))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections[self.alias].close()
+
+        threads = [threading.Thread(target=writer, args=(worker,)) for worker in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(Teachers.objects.using(self.alias).count(), 160)
+        self.assertEqual(len(set(Teachers.objects.using(self.alias).values_list('phone_number', flat=True))), 160)
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+
+
+class AsyncReadViewTests(TestCase):
+    """The async read views against their DRF counterparts, status and bytes."""
+
+    def setUp(self):
+        caches['default'].clear()
+        admin = CustomUser.objects.create_superuser(email="admin@example.com", password="pw")
+        student = CustomUser.objects.create_user(email="student@example.com", password="pw")
+        self.admin_token = str(ClaimsRefreshToken.for_user(admin).access_token)
+        self.student_token = str(ClaimsRefreshToken.for_user(student).access_token)
+        generate_timetable({3: ['A', 'B']})
+        teacher = Teachers.objects.create(name="Zoë", phone_number="1", department="MATHS")
+        subject = Subjects.objects.create(semester=3, name="Maths", subject_code="M1")
+        Teacher_Subject.objects.create(teacher=teacher, subject=subject, assigned_date=datetime.date(2025, 1, 6))
+        Teachers.objects.create(name="Ravi", phone_number="2")
+        Timetable.objects.filter(semester=3, day='Tuesday').update(subject=subject, teacher=teacher)
+
+    def call(self, view, path, params=None, token=None, method='get'):
+        headers = {'HTTP_AUTHORIZATION': f"Bearer {token}"} if token else {}
+        response = async_to_sync(view)(getattr(RequestFactory(), method)(path, params or {}, **headers))
+        # Requests handed to a DRF view come back unrendered, as they do to Django's handler
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+    def assertSameResponse(self, view, path, params=None, token=None):
+        client = APIClient()
+        if token:
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        # Both from a cold cache
+        response = self.call(view, path, params, token)
+        caches['default'].clear()
+        expected = client.get(path, params or {})
+        caches['default'].clear()
+        self.assertEqual((response.status_code, response.content), (expected.status_code, expected.content))
+        return response
+
+    def test_timetable_matches_drf_view(self):
+        path = '/api/get_timetable_by_semester/'
+        for params in ({'semester': 3, 'grade': 'A'}, {'semester': 3, 'grade': 'A', 'layout': 'grid'},
+                       {'layout': 'grid', 'divisions': '3:A,3:B'}, {'semester': 4, 'grade': 'A'},
+                       {'semester': 'x', 'grade': 'A'}, {'layout': 'table'}):
+            self.assertSameResponse(async_views.get_timetable_by_semester, path, params, self.student_token)
+        self.assertEqual(self.assertSameResponse(async_views.get_timetable_by_semester, path).status_code, 401)
+
+        # Cached grids and users are served without a query
+        self.call(async_views.get_timetable_by_semester, path, {'semester': 3, 'grade': 'A'}, self.student_token)
+        with self.assertNumQueries(0):
+            response = self.call(async_views.get_timetable_by_semester, path, {'semester': 3, 'grade': 'A'},
+                                 self.student_token)
+        self.assertEqual(response.status_code, 200)
+
+    def test_lists_match_drf_views(self):
+        for view, path in ((async_views.teacher_list, '/api/teachers/'), (async_views.subject_list, '/api/subjects/')):
+            for params in ({}, {'fields': 'id,name'}, {'semester': 3}, {'department': 'MATHS'}, {'expand': 'subjects'}):
+                self.assertSameResponse(view, path, params, self.admin_token)
+            self.assertEqual(self.assertSameResponse(view, path, token=self.student_token).status_code, 403)
+        self.assertEqual(self.assertSameResponse(async_views.teacher_list, '/api/teachers/', {'subject': 'x'},
+                                                 self.admin_token).status_code, 400)
+        self.assertSameResponse(async_views.get_structure, '/api/get_structure/')
+
+    def test_writes_go_to_drf_view(self):
+        response = self.call(async_views.teacher_list, '/api/teachers/',
+                             {'name': "Anu", 'phone_number': "3", 'department': "CS", 'subjects': []},
+                             self.admin_token, method='post')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Teachers.objects.filter(name="Anu").exists())
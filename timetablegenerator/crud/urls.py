@@ -1,6 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import TeacherViewSet,SubjectViewSet,TeacherSubjectViewSet,PopulateTimetableView
+from django.conf import settings
 from django.urls import path
 from .management.commands.generate_timetable import SEMESTER_DIVISIONS
 from django.http import JsonResponse
@@ -12,7 +13,12 @@ from .views import (
     AddTeacherToTimetableView,  # Import the new view
     AddSubjectToTimetableView,  # Add Subject to Timetable
     RemoveSubjectFromTimetableView  ,
-    GetTimetableBySemesterView
+    GetTimetableBySemesterView,
+    BulkTimetableEditView,
+    RepairTimetableView,
+    GenerationJobView,
+    ExportTimetableView,
+    ImportRecordsView
 )
 router = DefaultRouter()
 router.register(r'teachers', TeacherViewSet)
@@ -22,6 +28,13 @@ urlpatterns = [
     path('teachers/assign/', TeacherSubjectViewSet , name='teacher-assign'),
     path('', include(router.urls)),
     path('populate-timetable/', PopulateTimetableView.as_view(), name='populate-timetable'),
+
+    # Re-solve only the given slots, e.g. after a teacher was removed
+    path('repair-timetable/', RepairTimetableView.as_view(), name='repair-timetable'),
+
+    # Background generation jobs, run by `manage.py run_generation_worker`
+    path('generation-jobs/', GenerationJobView.as_view(), name='generation-jobs'),
+    path('generation-jobs/<int:job_id>/', GenerationJobView.as_view(), name='generation-job'),
     path('remove_teacher_and_subject/', RemoveTeacherAndSubjectView.as_view(), name='remove_teacher_and_subject'),
 
     # Endpoint to remove only the teacher from a specific time slot
@@ -38,6 +51,26 @@ urlpatterns = [
     # New endpoint to remove a subject from a specific timetable slot
     path('remove_subject_from_timetable/', RemoveSubjectFromTimetableView.as_view(), name='remove_subject_from_timetable'),
     path('get_timetable_by_semester/', GetTimetableBySemesterView.as_view(), name='get_timetable_by_semester'),
+
+    # Every timetable at once as timetable.csv or timetable.ics
+    path('export/timetable.<str:extension>', ExportTimetableView.as_view(), name='export_timetable'),
+
+    # Bulk upsert of teachers, subjects or qualifications from a CSV/JSON file
+    path('import/<str:kind>/', ImportRecordsView.as_view(), name='import_records'),
+
+    # Apply a batch of slot edits in one request
+    path('timetable/bulk/', BulkTimetableEditView.as_view(), name='timetable_bulk_edit'),
     path('get_structure/', lambda request: JsonResponse(SEMESTER_DIVISIONS, safe=False)),
 
-]
\ No newline at end of file
+]
+
+# Under ASGI the async read views answer first, the list routes ahead of the router's
+if getattr(settings, 'TIMETABLE_ASYNC_READS', False):
+    from . import async_views
+
+    urlpatterns = [
+        path('teachers/', async_views.teacher_list, name='teacher-list'),
+        path('subjects/', async_views.subject_list, name='subject-list'),
+        path('get_timetable_by_semester/', async_views.get_timetable_by_semester, name='get_timetable_by_semester'),
+        path('get_structure/', async_views.get_structure),
+    ] + urlpatterns
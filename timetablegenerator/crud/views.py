@@ -1,22 +1,91 @@
 from .models import Teachers,Subjects,Teacher_Subject
-from .serializers import TeachersSerializer,SubjectSerializer,TeacherSubjectSerializer,TimetableSerializer
+from .serializers import TeachersSerializer,SubjectSerializer,TeacherSubjectSerializer
+from .filters import QueryParamFilterMixin, expanded, filter_by_params
+from .pagination import OptionalCursorPagination
 from rest_framework import viewsets
-from rest_framework.permissions import IsAdminUser
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 # Create your views here.
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework.permissions import IsAdminUser
 from datetime import date
 
-class TeacherViewSet(viewsets.ModelViewSet):
+class TeacherViewSet(QueryParamFilterMixin, viewsets.ModelViewSet):
     queryset = Teachers.objects.all()
     serializer_class = TeachersSerializer
     permission_classes=[IsAdminUser]
-
-class SubjectViewSet(viewsets.ModelViewSet):
+    pagination_class = OptionalCursorPagination
+    filter_params = {'department': 'department', 'name': 'name__icontains', 'subject': 'subjects'}
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # Subject ids are part of every serialized teacher, fetched for the whole page in one extra query
+        if self.action != 'schedule':
+            queryset = queryset.prefetch_related('subjects')
+        return queryset
+
+    # Teacher names are part of the cached timetable grids
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        invalidate_all()
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        invalidate_all()
+
+    # The teacher's own week as a day by slot grid. Reads at most one week of rows
+    # through the (teacher, day_number, slot_number) index, however many divisions exist.
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
+    def schedule(self, request, pk=None):
+        teacher = self.get_object()
+        days = [day for day, _ in Timetable.DAY_CHOICES]
+        slots = [slot for slot, _ in Timetable.TIME_SLOTS]
+        grid = [[None] * len(slots) for _ in days]
+        lessons = Timetable.objects.filter(
+            teacher=teacher, day_number__isnull=False, slot_number__isnull=False
+        ).values_list(
+            'day_number', 'slot_number', 'semester', 'grade', 'subject_id', 'subject__name', 'subject__subject_code'
+        )
+        for day_number, slot_number, semester, grade, subject_id, subject_name, subject_code in lessons:
+            grid[day_number][slot_number] = {
+                "semester": semester,
+                "grade": grade,
+                "subject_id": subject_id,
+                "subject": subject_name,
+                "subject_code": subject_code,
+            }
+
+        hours_per_day = {day: sum(lesson is not None for lesson in row) for day, row in zip(days, grid)}
+        return Response({
+            "teacher": {"id": teacher.id, "name": teacher.name, "department": teacher.department},
+            "days": days,
+            "time_slots": slots,
+            "grid": grid,
+            "hours_per_day": hours_per_day,
+            "total_hours": sum(hours_per_day.values()),
+        }, status=200)
+
+class SubjectViewSet(QueryParamFilterMixin, viewsets.ModelViewSet):
     queryset=Subjects.objects.all()
     serializer_class=SubjectSerializer
     permission_classes=[IsAdminUser]
+    pagination_class = OptionalCursorPagination
+    filter_params = {'semester': 'semester', 'teacher': 'teachers'}
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if expanded(self.request, 'teachers'):
+            queryset = queryset.prefetch_related('teachers_set')
+        return queryset
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        invalidate_all()
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        invalidate_all()
 
 @api_view(['GET', 'POST', 'PUT', 'PATCH', 'DELETE'])
 def TeacherSubjectViewSet(request):
@@ -35,9 +104,21 @@ def TeacherSubjectViewSet(request):
             return Response({"message":"Teacher has already been assigned"},status=409)
         return Response({"message":"success"},status=201)
     elif request.method=='GET':
-        teacher_subjects = Teacher_Subject.objects.all()
-        serializer = TeacherSubjectSerializer(teacher_subjects, many=True)
-        return Response(serializer.data, status=200)     
+        teacher_subjects = filter_by_params(Teacher_Subject.objects.all(), request.query_params, {
+            'teacher': 'teacher_id', 'subject': 'subject_id', 'semester': 'subject__semester',
+        })
+        if expanded(request, 'teacher'):
+            teacher_subjects = teacher_subjects.select_related('teacher')
+        if expanded(request, 'subject'):
+            teacher_subjects = teacher_subjects.select_related('subject')
+        paginator = OptionalCursorPagination()
+        page = paginator.paginate_queryset(teacher_subjects, request)
+        serializer = TeacherSubjectSerializer(
+            teacher_subjects if page is None else page, many=True, context={'request': request}
+        )
+        if page is not None:
+            return paginator.get_paginated_response(serializer.data)
+        return Response(serializer.data, status=200)
     elif request.method == 'PUT':
         teacher = request.data.get('teacher')
         subject = request.data.get('subject')
@@ -51,53 +132,125 @@ def TeacherSubjectViewSet(request):
             return Response({"message": "Deleted successfully"}, status=200)
         except Teacher_Subject.DoesNotExist:
             return Response({"message": "Teacher-Subject relation not found"}, status=404)
+import csv
 import logging
+from collections import namedtuple
 from django.shortcuts import get_object_or_404
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from django.db import transaction
+from django.db.models import Q
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import parse_etags
+from .cache import get_grid, invalidate, invalidate_all, make_entry, store_grid
+from .export import EXPORT_CONTENT_TYPES, export_rows, iter_csv, iter_ics
+from .importer import KINDS as IMPORT_KINDS, import_records, read_rows
+from .rendering import compact_grids, dumps, grid_rows
 from .models import Timetable, Subjects, Teachers
-from random import choice
+from .jobs import enqueue_job
+from .models import GenerationJob
+from .operations import clear_timetable, populate_timetable, repair_timetable
+from .serializers import GenerationJobSerializer
+from .solver import load_occupancy
 
 # Setup logger
 logger = logging.getLogger(__name__)
 
+
+def _lock_teachers(teacher_ids):
+    """
+    Lock the teachers' rows until the transaction ends, so two requests
+    booking the same teacher check and write one after the other. Under
+    READ COMMITTED both would otherwise see no clash and both book. SQLite
+    has no row locks, but its transactions take the write lock up front.
+    """
+    # In id order, so two requests locking several teachers can't deadlock
+    list(Teachers.objects.select_for_update().filter(pk__in=teacher_ids).order_by('pk').values_list('pk', flat=True))
+
+
+def _find_teacher_conflict(timetable_entry, teacher_id):
+    """Return the other Timetable row that already books this teacher in the entry's slot, if any."""
+    if timetable_entry.teacher_id == teacher_id:
+        return None
+    # Always asked of the database: other web workers, the generation worker and the admin
+    # book teachers too. The timetable_teacher_week index narrows it to the teacher's week.
+    return Timetable.objects.filter(
+        teacher_id=teacher_id, day=timetable_entry.day, time_slot=timetable_entry.time_slot
+    ).exclude(pk=timetable_entry.pk).with_related().first()
+
+
+def _cached_json_response(request, entry):
+    # Clients that already hold this version of the grid get an empty 304
+    if entry['etag'] in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(entry['body'], content_type='application/json')
+    response['ETag'] = entry['etag']
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _conflict_response(conflict):
+    return Response({
+        "error": f"Teacher {conflict.teacher} is already assigned to Semester {conflict.semester} "
+                 f"Grade {conflict.grade} on {conflict.day} at {conflict.time_slot}."
+    }, status=status.HTTP_409_CONFLICT)
+
+
+def _job_accepted_response(job):
+    return Response({
+        "message": "Job queued.",
+        "job_id": job.pk,
+        "status_url": f"/api/generation-jobs/{job.pk}/",
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+def _queue_job(request, kind, payload=None):
+    # Jobs are for admins whichever endpoint queues them, as on GenerationJobView
+    if not request.user.is_staff:
+        return Response({"error": "Only admins can queue generation jobs."}, status=status.HTTP_403_FORBIDDEN)
+    return _job_accepted_response(enqueue_job(kind, payload))
+
+
+def _parse_repair_slots(slots):
+    """
+    The dirty (semester, grade, day, time_slot) tuples of a repair request and
+    the teacher ids each one must not get back. Raises ValueError when malformed.
+    """
+    if not isinstance(slots, list) or not slots:
+        raise ValueError("A non-empty list of slots is required.")
+    try:
+        dirty = [(int(slot["semester"]), slot["grade"], slot["day"], slot["time_slot"]) for slot in slots]
+        avoid = {key: set(slot["avoid_teacher_ids"]) for key, slot in zip(dirty, slots) if slot.get("avoid_teacher_ids")}
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("Each slot needs semester, grade, day and time_slot.")
+    return dirty, avoid
+
+
+def _repair_payload(dirty, avoid):
+    # JSON has no tuple keys or sets, crud.jobs.run_job turns these back
+    return {
+        "slots": dirty,
+        "avoid": [{"slot": slot, "teacher_ids": sorted(ids)} for slot, ids in avoid.items()],
+    }
+
+
 class PopulateTimetableView(APIView):
     def post(self, request, *args, **kwargs):
+        # Large institutions can hand the work to the generation worker and poll for progress
+        if request.data.get("async"):
+            return _queue_job(request, 'populate')
         try:
-            # Loop through each semester (1 to 8)
-            for semester in range(1, 9):
-                # Fetch the subjects and teachers for the current semester
-                subjects = Subjects.objects.filter(semester=semester)
-                teachers = Teachers.objects.filter(department='COMPUTER SCIENCE')  # Assuming CS for simplicity
-                
-                # Check if there are subjects and teachers available
-                if not subjects.exists():
-                    logger.warning(f"No subjects found for semester {semester}. Skipping...")
-                    continue
-
-                if not teachers.exists():
-                    logger.warning(f"No teachers found for semester {semester}. Skipping...")
-                    continue
-
-                # Loop through each Timetable entry for the current semester where subject or teacher is null
-                timetable_entries = Timetable.objects.filter(semester=semester, subject__isnull=True) | Timetable.objects.filter(semester=semester, teacher__isnull=True)
-
-                for timetable_entry in timetable_entries:
-                    # Randomly assign a subject if it's null
-                    if timetable_entry.subject is None:
-                        timetable_entry.subject = choice(subjects)
-                        logger.info(f"Assigned subject {timetable_entry.subject} to {timetable_entry}")
-                    
-                    # Randomly assign a teacher if it's null
-                    if timetable_entry.teacher is None:
-                        timetable_entry.teacher = choice(teachers)
-                        logger.info(f"Assigned teacher {timetable_entry.teacher} to {timetable_entry}")
-                    
-                    # Save the updated timetable entry
-                    timetable_entry.save()
-
-            return Response({"message": "Timetable populated successfully!"}, status=status.HTTP_200_OK)
+            # Let the solver fill every empty cell, solving independent groups of semesters
+            # and teachers side by side, and write the result in one transaction
+            updated, solution = populate_timetable()
+
+            return Response({
+                "message": "Timetable populated successfully!",
+                "updated": updated,
+                "unsatisfied": solution.unsatisfied,
+            }, status=status.HTTP_200_OK)
 
         except Exception as e:
             logger.error(f"Error occurred while populating timetable: {str(e)}")
@@ -110,7 +263,7 @@ class RemoveTeacherAndSubjectView(APIView):
         semester = request.data.get("semester")
         day = request.data.get("day")
         time_slot = request.data.get("time_slot")
-        grade=request.data("grade")
+        grade=request.data.get("grade")
         # Find the specific timetable entry
         timetable_entry = Timetable.objects.filter(
             semester=semester, day=day, time_slot=time_slot,grade=grade).first()
@@ -119,6 +272,7 @@ class RemoveTeacherAndSubjectView(APIView):
             timetable_entry.subject = None
             timetable_entry.teacher = None
             timetable_entry.save()
+            invalidate(timetable_entry.semester, timetable_entry.grade)
             logger.info(f"Removed teacher and subject from {semester} - {day} - {time_slot}")
             return Response({"message": "Teacher and subject removed successfully."}, status=status.HTTP_200_OK)
         return Response({"error": "Timetable entry not found."}, status=status.HTTP_400_BAD_REQUEST)
@@ -131,14 +285,30 @@ class RemoveTeacherView(APIView):
         day = request.data.get("day")
         time_slot = request.data.get("time_slot")
         grade=request.data.get("grade")
+        # Repairing rewrites other cells, which is for admins only as on RepairTimetableView
+        if request.data.get("repair") and not request.user.is_staff:
+            return Response({"error": "Only admins can repair the timetable."}, status=status.HTTP_403_FORBIDDEN)
         # Find the specific timetable entry
         timetable_entry = Timetable.objects.filter(
             semester=semester, day=day, time_slot=time_slot,grade=grade).first()
 
         if timetable_entry:
+            previous_teacher_id = timetable_entry.teacher_id
             timetable_entry.teacher = None
             timetable_entry.save()
+            invalidate(timetable_entry.semester, timetable_entry.grade)
             logger.info(f"Removed teacher from {semester} - {day} - {time_slot}")
+
+            # Optionally fill the hole straight away with another qualified teacher
+            if request.data.get("repair"):
+                slot = (timetable_entry.semester, grade, day, time_slot)
+                avoid = {slot: {previous_teacher_id}} if previous_teacher_id else None
+                updated, solution = repair_timetable([slot], avoid)
+                return Response({
+                    "message": "Teacher removed successfully.",
+                    "updated": updated,
+                    "unsatisfied": solution.unsatisfied,
+                }, status=status.HTTP_200_OK)
             return Response({"message": "Teacher removed successfully."}, status=status.HTTP_200_OK)
         return Response({"error": "Timetable entry not found."}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -156,13 +326,24 @@ class AddTeacherAndSubjectView(APIView):
         subject = get_object_or_404(Subjects, id=subject_id)
         teacher = get_object_or_404(Teachers, id=teacher_id)
         
-        # Find or create the specific timetable entry
-        timetable_entry, created = Timetable.objects.get_or_create(
-            semester=semester, day=day, time_slot=time_slot,grade=grade)
-        
-        timetable_entry.subject = subject
-        timetable_entry.teacher = teacher
-        timetable_entry.save()
+        # The teacher stays locked from the check to the write, so no booking can slip in between
+        with transaction.atomic():
+            _lock_teachers([teacher.id])
+            # Find the specific timetable entry, it is only created once the teacher is known to be free
+            timetable_entry = Timetable.objects.filter(
+                semester=semester, day=day, time_slot=time_slot,grade=grade).first()
+            created = timetable_entry is None
+            if created:
+                timetable_entry = Timetable(semester=semester, day=day, time_slot=time_slot, grade=grade)
+
+            conflict = _find_teacher_conflict(timetable_entry, teacher.id)
+            if conflict:
+                return _conflict_response(conflict)
+
+            timetable_entry.subject = subject
+            timetable_entry.teacher = teacher
+            timetable_entry.save()
+        invalidate(timetable_entry.semester, timetable_entry.grade)
         
         if created:
             logger.info(f"Added teacher and subject to new entry: {semester} - {day} - {time_slot}")
@@ -175,9 +356,11 @@ class AddTeacherAndSubjectView(APIView):
 # 4. Remove all teacher-subject assignments from all timetables
 class RemoveAllTeacherSubjectView(APIView):
     def post(self, request, *args, **kwargs):
+        if request.data.get("async"):
+            return _queue_job(request, 'clear')
         # Remove all teacher-subject assignments
-        Timetable.objects.update(subject=None, teacher=None)
-        
+        clear_timetable()
+
         logger.info("Removed all teacher-subject assignments from the timetable.")
         return Response({"message": "All teacher-subject assignments removed successfully."}, status=status.HTTP_200_OK)
 
@@ -206,14 +389,21 @@ class AddTeacherToTimetableView(APIView):
                 day=day,
                 time_slot=time_slot,
                 grade=grade
-            ).first()
+            ).with_related().first()
 
             if timetable_entry is None:
                 return Response({"error": "No timetable entry found for the provided details."}, status=status.HTTP_404_NOT_FOUND)
 
-            # Assign the teacher to the timetable entry
-            timetable_entry.teacher = teacher
-            timetable_entry.save()
+            with transaction.atomic():
+                _lock_teachers([teacher.id])
+                conflict = _find_teacher_conflict(timetable_entry, teacher.id)
+                if conflict:
+                    return _conflict_response(conflict)
+
+                # Assign the teacher to the timetable entry
+                timetable_entry.teacher = teacher
+                timetable_entry.save()
+            invalidate(timetable_entry.semester, timetable_entry.grade)
 
             return Response({
                 "message": f"Teacher {teacher.name} successfully assigned to {timetable_entry.subject.name} on {day} at {time_slot}."
@@ -247,7 +437,7 @@ class AddSubjectToTimetableView(APIView):
                 day=day,
                 time_slot=time_slot,
                 grade=grade
-            ).first()
+            ).with_related().first()
 
             if timetable_entry is None:
                 return Response({"error": "No timetable entry found for the provided details."}, status=status.HTTP_404_NOT_FOUND)
@@ -255,6 +445,7 @@ class AddSubjectToTimetableView(APIView):
             # Assign the subject to the timetable entry
             timetable_entry.subject = subject
             timetable_entry.save()
+            invalidate(timetable_entry.semester, timetable_entry.grade)
 
             return Response({
                 "message": f"Subject {subject.name} successfully assigned to {timetable_entry.teacher.name} on {day} at {time_slot}."
@@ -280,7 +471,7 @@ class RemoveSubjectFromTimetableView(APIView):
                 day=day,
                 time_slot=time_slot,
                 grade=grade
-            ).first()
+            ).with_related().first()
 
             if timetable_entry is None:
                 return Response({"error": "No timetable entry found for the provided details."}, status=status.HTTP_404_NOT_FOUND)
@@ -288,6 +479,7 @@ class RemoveSubjectFromTimetableView(APIView):
             # Remove the subject from the timetable entry
             timetable_entry.subject = None
             timetable_entry.save()
+            invalidate(timetable_entry.semester, timetable_entry.grade)
 
             return Response({
                 "message": f"Subject successfully removed from {timetable_entry.teacher.name}'s class on {day} at {time_slot}."
@@ -297,41 +489,349 @@ class RemoveSubjectFromTimetableView(APIView):
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
 
+class RepairTimetableView(APIView):
+    """
+    Re-solve a few slots instead of the whole institution.
+
+    Takes {"slots": [{"semester", "grade", "day", "time_slot"}, ...]}; a slot may
+    also list "avoid_teacher_ids" that must not be put back into it. Only the
+    weeks of those divisions may change; every other division is left alone.
+    """
+    permission_classes = [IsAdminUser]
+
+    def post(self, request, *args, **kwargs):
+        try:
+            dirty, avoid = _parse_repair_slots(request.data.get("slots"))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if request.data.get("async"):
+            return _job_accepted_response(enqueue_job('repair', _repair_payload(dirty, avoid)))
+        try:
+            updated, solution = repair_timetable(dirty, avoid)
+        except Exception as e:
+            logger.error(f"Error occurred while repairing timetable: {str(e)}")
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "message": "Timetable repaired successfully!",
+            "updated": updated,
+            "unsatisfied": solution.unsatisfied,
+        }, status=status.HTTP_200_OK)
+
+
+def _parse_divisions(value):
+    # "3:A,4:B" -> [(3, 'A'), (4, 'B')]
+    divisions = []
+    for item in value.split(','):
+        semester, _, grade = item.partition(':')
+        if not grade:
+            raise ValueError(item)
+        divisions.append((int(semester), grade))
+    return divisions
+
+
+# What a get_timetable_by_semester request asks for. ``divisions`` is set instead
+# of semester and grade when several divisions are read at once.
+_TimetableQuery = namedtuple('_TimetableQuery', 'layout semester grade divisions')
+
+
+def _parse_timetable_query(params):
+    """
+    The _TimetableQuery of the query string, shared by the sync and async
+    views. Raises ValueError with the message to answer with a 400.
+    """
+    # ?layout=grid sends a compact day by slot matrix instead of a list of slots
+    layout = params.get('layout', 'list')
+    if layout not in ('list', 'grid'):
+        raise ValueError("layout must be 'list' or 'grid'.")
+    if layout == 'grid' and params.get('divisions'):
+        # Several divisions in one response and one query, e.g. ?layout=grid&divisions=3:A,3:B
+        try:
+            return _TimetableQuery(layout, None, None, _parse_divisions(params['divisions']))
+        except ValueError:
+            raise ValueError("divisions must look like '3:A,3:B'.")
+
+    semester = params.get('semester')
+    grade = params.get('grade')  # Grade represents division
+    if not semester or not grade:
+        raise ValueError("Both 'semester' and 'grade' are required.")
+    try:
+        semester = int(semester)
+    except ValueError:
+        raise ValueError("Invalid semester value. It should be an integer.")
+    return _TimetableQuery(layout, semester, grade, None)
+
+
+def _timetable_queryset(query):
+    if query.divisions is not None:
+        in_divisions = Q()
+        for semester, grade in query.divisions:
+            in_divisions |= Q(semester=semester, grade=grade)
+        return Timetable.objects.filter(in_divisions)
+    timetable = Timetable.objects.filter(semester=query.semester, grade=query.grade)
+    # The list is read already in week order, as plain rows shaped like TimetableSerializer's output
+    return timetable if query.layout == 'grid' else timetable.in_week_order()
+
+
+def _not_found(query, data):
+    """The 404 body when ``data``, the grids or rows read for ``query``, is empty, or None."""
+    if data["divisions"] if query.layout == 'grid' else data:
+        return None
+    if query.divisions is not None:
+        return {"message": "No timetable entries found for these divisions."}
+    return {"message": f"No timetable entries found for Semester {query.semester}, Grade {query.grade}."}
+
+
 class GetTimetableBySemesterView(APIView):
     def get(self, request, *args, **kwargs):
         try:
-            # Get semester and grade from query parameters
-            semester = request.query_params.get('semester')
-            grade = request.query_params.get('grade')  # Grade represents division
+            query = _parse_timetable_query(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            # A current cached grid is answered without touching the database.
+            # Several divisions at once are not cached.
+            version, entry = (None, None) if query.divisions else get_grid(query.semester, query.grade, query.layout)
+            if entry is None:
+                data = (compact_grids if query.layout == 'grid' else grid_rows)(_timetable_queryset(query))
+                not_found = _not_found(query, data)
+                if not_found:
+                    return Response(not_found, status=status.HTTP_404_NOT_FOUND)
+                # Render once and keep the JSON
+                if query.divisions:
+                    entry = make_entry(dumps(data))
+                else:
+                    entry = store_grid(query.semester, query.grade, version, dumps(data), query.layout)
+
+            return _cached_json_response(request, entry)
+
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
 
-            if not semester or not grade:
-                return Response({"error": "Both 'semester' and 'grade' are required."}, status=status.HTTP_400_BAD_REQUEST)
+class BulkTimetableEditView(APIView):
+    """
+    Apply many slot edits in one request.
+
+    The body is a list of operations (or {"operations": [...]}). Each one names
+    a slot with semester, grade, day and time_slot, and either assigns
+    subject_id and/or teacher_id (``"action": "assign"``, the default) or
+    clears ``fields`` (``"action": "clear"``, subject and teacher by default).
+    Operations run in order, so a later one sees the result of an earlier one.
+    The batch is all or nothing: if any operation is invalid or would
+    double-book a teacher, nothing is saved and the errors are reported with
+    a 400.
+    """
+    permission_classes = [IsAdminUser]
 
+    def patch(self, request, *args, **kwargs):
+        operations = request.data
+        if isinstance(operations, dict):
+            operations = operations.get("operations")
+        if not isinstance(operations, list):
+            return Response({"error": "Expected a list of operations."}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = [{"index": index, "status": "ok"} for index in range(len(operations))]
+        keys = {}
+        for index, operation in enumerate(operations):
+            error = self._validate(operation)
+            if error:
+                results[index].update(status="error", error=error)
+            else:
+                keys[index] = (int(operation["semester"]), operation["grade"], operation["day"], operation["time_slot"])
+        if len(keys) < len(operations):
+            return self._rejected(results)
+
+        # Every referenced subject, teacher and slot is loaded with one query each
+        subjects = Subjects.objects.in_bulk({op["subject_id"] for op in operations if op.get("subject_id") is not None})
+        teachers = Teachers.objects.in_bulk({op["teacher_id"] for op in operations if op.get("teacher_id") is not None})
+
+        with transaction.atomic():
+            # The teachers stay locked until the batch is written, so a single booking elsewhere
+            # can't slip in after their weeks are read, and vice versa
+            _lock_teachers(list(teachers))
+            occupancy = load_occupancy(teacher_ids=list(teachers))
+            # Lock and load only the edited cells, not every combination of their values
+            edited = Q()
+            for semester, grade, day, time_slot in set(keys.values()):
+                edited |= Q(semester=semester, grade=grade, day=day, time_slot=time_slot)
+            rows = Timetable.objects.select_for_update().filter(edited) if keys else []
+            entries = {(row.semester, row.grade, row.day, row.time_slot): row for row in rows}
+
+            for index, key in keys.items():
+                error = self._apply(operations[index], entries.get(key), subjects, teachers, occupancy)
+                if error:
+                    results[index].update(status="error", error=error)
+            if any(result["status"] == "error" for result in results):
+                return self._rejected(results)
+
+            changed = [entries[key] for key in set(keys.values())]
+            Timetable.objects.bulk_update(changed, fields=['subject', 'teacher'])
+
+        for semester, grade in {(entry.semester, entry.grade) for entry in changed}:
+            invalidate(semester, grade)
+
+        logger.info(f"Bulk edit applied {len(changed)} timetable changes")
+        return Response({"updated": len(changed), "results": results}, status=status.HTTP_200_OK)
+
+    def _rejected(self, results):
+        return Response({
+            "error": "No changes were saved, fix the failed operations and resend the batch.",
+            "updated": 0,
+            "results": results,
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    def _validate(self, operation):
+        if not isinstance(operation, dict):
+            return "Operation must be an object."
+        if any(not operation.get(field) for field in ("semester", "grade", "day", "time_slot")):
+            return "Missing required fields."
+        try:
+            int(operation["semester"])
+        except (TypeError, ValueError):
+            return "Invalid semester value. It should be an integer."
+        for field in ("subject_id", "teacher_id"):
+            # JSON true and false are ints to isinstance()
+            value = operation.get(field)
+            if value is not None and (not isinstance(value, int) or isinstance(value, bool)):
+                return f"Invalid {field} value. It should be an integer."
+        action = operation.get("action", "assign")
+        if action == "assign":
+            if operation.get("subject_id") is None and operation.get("teacher_id") is None:
+                return "Nothing to assign, give subject_id and/or teacher_id."
+        elif action == "clear":
+            if not set(operation.get("fields", ["subject", "teacher"])) <= {"subject", "teacher"}:
+                return "Only 'subject' and 'teacher' can be cleared."
+        else:
+            return f"Unknown action '{action}'."
+        return None
+
+    def _apply(self, operation, timetable_entry, subjects, teachers, occupancy):
+        if timetable_entry is None:
+            return "No timetable entry found for the provided details."
+        time = occupancy.time_of(timetable_entry.day, timetable_entry.time_slot)
+
+        if operation.get("action", "assign") == "clear":
+            fields = operation.get("fields", ["subject", "teacher"])
+            if "teacher" in fields and timetable_entry.teacher_id is not None:
+                occupancy.free(timetable_entry.teacher_id, time)
+                timetable_entry.teacher = None
+            if "subject" in fields:
+                timetable_entry.subject = None
+            return None
+
+        subject = teacher = None
+        if operation.get("subject_id") is not None:
+            subject = subjects.get(operation["subject_id"])
+            if subject is None:
+                return "Subject not found."
+        if operation.get("teacher_id") is not None:
+            teacher = teachers.get(operation["teacher_id"])
+            if teacher is None:
+                return "Teacher not found."
+            if teacher.id != timetable_entry.teacher_id and occupancy.is_busy(teacher.id, time):
+                return f"Teacher {teacher.name} is already assigned on {timetable_entry.day} at {timetable_entry.time_slot}."
+
+        if subject is not None:
+            timetable_entry.subject = subject
+        if teacher is not None:
+            if timetable_entry.teacher_id is not None:
+                occupancy.free(timetable_entry.teacher_id, time)
+            occupancy.book(teacher.id, time)
+            timetable_entry.teacher = teacher
+        return None
+
+
+class GenerationJobView(APIView):
+    """Queue a populate, clear or repair job, or poll one for progress."""
+    permission_classes = [IsAdminUser]
+
+    def post(self, request, *args, **kwargs):
+        kind = request.data.get("kind")
+        if kind not in dict(GenerationJob.KIND_CHOICES):
+            return Response({"error": "kind must be one of populate, clear or repair."}, status=status.HTTP_400_BAD_REQUEST)
+        payload = {}
+        if kind == 'repair':
             try:
-                semester = int(semester)
-            except ValueError:
-                return Response({"error": "Invalid semester value. It should be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+                payload = _repair_payload(*_parse_repair_slots(request.data.get("slots")))
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return _job_accepted_response(enqueue_job(kind, payload))
+
+    def get(self, request, job_id=None, *args, **kwargs):
+        if job_id is None:
+            jobs = GenerationJob.objects.order_by('-created_at')[:20]
+            return Response(GenerationJobSerializer(jobs, many=True).data, status=status.HTTP_200_OK)
+        job = get_object_or_404(GenerationJob, pk=job_id)
+        return Response(GenerationJobSerializer(job).data, status=status.HTTP_200_OK)
+
+
+class ExportTimetableView(APIView):
+    """
+    The whole institution's timetable as CSV or iCalendar, optionally
+    narrowed to one division (?semester=&grade=) or teacher (?teacher=).
+    Both are streamed while the rows are read.
+    """
+    permission_classes = [IsAdminUser]
 
-            # Fetch timetable entries based on semester and grade
-            timetable_entries = Timetable.objects.filter(semester=semester, grade=grade)
+    def get(self, request, extension, *args, **kwargs):
+        if extension not in EXPORT_CONTENT_TYPES:
+            return Response({"error": "Export format must be csv or ics."}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            semester = request.query_params.get('semester')
+            semester = int(semester) if semester else None
+            teacher = request.query_params.get('teacher')
+            teacher = int(teacher) if teacher else None
+        except ValueError:
+            return Response({"error": "semester and teacher must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+        grade = request.query_params.get('grade') or None
+
+        rows = export_rows(semester=semester, grade=grade, teacher=teacher)
+        filename = "timetable"
+        if teacher is not None:
+            filename += f"-teacher-{teacher}"
+        if semester is not None:
+            filename += f"-semester-{semester}"
+        if grade is not None:
+            filename += f"-{grade}"
+
+        if extension == 'csv':
+            content = iter_csv(rows)
+        else:
+            content = iter_ics(rows, filename.replace('-', ' ').capitalize())
+        response = StreamingHttpResponse(content, content_type=EXPORT_CONTENT_TYPES[extension])
+        response['Content-Disposition'] = f'attachment; filename="{filename}.{extension}"'
+        return response
 
-            if not timetable_entries.exists():
-                return Response({"message": f"No timetable entries found for Semester {semester}, Grade {grade}."}, status=status.HTTP_404_NOT_FOUND)
 
-            # Custom sort order for days of the week
-            day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
-            
-            # Sort timetable entries by day using the custom day_order list
-            sorted_timetable_entries = sorted(
-                timetable_entries,
-                key=lambda x: day_order.index(x.day)
-            )
+class ImportRecordsView(APIView):
+    """
+    Import teachers, subjects or qualifications in bulk from an uploaded
+    .csv, .jsonl or .json ``file``, or from a JSON array sent as the body.
+    """
+    permission_classes = [IsAdminUser]
 
-            # Serialize the queryset
-            serializer = TimetableSerializer(sorted_timetable_entries, many=True)
+    def post(self, request, kind, *args, **kwargs):
+        if kind not in IMPORT_KINDS:
+            return Response(
+                {"error": f"Import kind must be one of {', '.join(IMPORT_KINDS)}."}, status=status.HTTP_404_NOT_FOUND
+            )
 
-            # Return the serialized data as JSON
-            return Response(serializer.data, status=status.HTTP_200_OK)
+        upload = request.FILES.get('file')
+        if upload is not None:
+            records = read_rows(upload, upload.name)
+        elif isinstance(request.data, list):
+            records = request.data
+        else:
+            return Response({"error": "Send a file or a JSON array of records."}, status=status.HTTP_400_BAD_REQUEST)
 
-        except Exception as e:
+        try:
+            report = import_records(kind, records)
+        except (ValueError, UnicodeDecodeError, csv.Error) as e:
+            logger.error(f"Import of {kind} failed: {str(e)}")
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        logger.info(f"Imported {kind}: {report['created']} created, {report['updated']} updated, {report['skipped']} skipped")
+        return Response(report, status=status.HTTP_200_OK)
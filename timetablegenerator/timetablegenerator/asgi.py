@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'timetablegenerator.settings')
+# Route the hot read endpoints to the async views in crud/async_views.py
+os.environ.setdefault('TIMETABLE_ASYNC_READS', '1')
 
 application = get_asgi_application()
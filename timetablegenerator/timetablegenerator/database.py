@@ -0,0 +1,76 @@
+"""
+The ``default`` database, chosen from the environment.
+
+DB_ENGINE=sqlite (the default) keeps the project's SQLite file, DB_NAME
+overriding its path. DB_ENGINE=postgres reads DB_NAME, DB_USER,
+DB_PASSWORD, DB_HOST and DB_PORT and needs psycopg installed
+(``psycopg[pool]`` for DB_POOL).
+
+DB_CONN_MAX_AGE keeps each worker's connection open for that many
+seconds (60 by default, 0 closes it after every request). DB_POOL=1
+shares a psycopg connection pool per process instead, sized by
+DB_POOL_MIN_SIZE and DB_POOL_MAX_SIZE; Django does not allow it together
+with persistent connections, so it sets CONN_MAX_AGE to 0.
+"""
+
+# Applied on every new SQLite connection. WAL lets readers run alongside the
+# one writer; with WAL, NORMAL sync stays crash-safe at a fraction of the fsyncs.
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA mmap_size=134217728",
+)
+
+ENGINES = {
+    'sqlite': 'django.db.backends.sqlite3',
+    'postgres': 'django.db.backends.postgresql',
+}
+
+
+def _flag(value):
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def database_config(environ, base_dir):
+    """The settings dict for DATABASES['default'] described by ``environ``."""
+    engine = environ.get('DB_ENGINE', 'sqlite').strip().lower()
+    if engine in ('postgresql', 'psql'):
+        engine = 'postgres'
+    if engine not in ENGINES:
+        raise ValueError(f"DB_ENGINE must be one of {', '.join(ENGINES)}, not '{engine}'")
+
+    config = {
+        'ENGINE': ENGINES[engine],
+        'CONN_MAX_AGE': int(environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+    }
+
+    if engine == 'sqlite':
+        config['NAME'] = environ.get('DB_NAME') or base_dir / 'db.sqlite3'
+        config['OPTIONS'] = {
+            'init_command': ';'.join(SQLITE_PRAGMAS),
+            # Take the write lock when the transaction starts. A deferred transaction
+            # that reads first and then writes cannot wait for the lock and fails with
+            # "database is locked" straight away; an immediate one waits up to timeout.
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': float(environ.get('DB_SQLITE_TIMEOUT', 20)),
+        }
+        return config
+
+    config.update({
+        'NAME': environ.get('DB_NAME', 'timetable'),
+        'USER': environ.get('DB_USER', 'postgres'),
+        'PASSWORD': environ.get('DB_PASSWORD', ''),
+        'HOST': environ.get('DB_HOST', 'localhost'),
+        'PORT': environ.get('DB_PORT', '5432'),
+        'OPTIONS': {},
+    })
+    if _flag(environ.get('DB_POOL', '')):
+        config['CONN_MAX_AGE'] = 0
+        config['OPTIONS']['pool'] = {
+            'min_size': int(environ.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(environ.get('DB_POOL_MAX_SIZE', 10)),
+        }
+    return config
@@ -11,8 +11,11 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 
+import os
 from pathlib import Path
 
+from .database import database_config
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -63,7 +66,7 @@ CORS_ALLOW_ALL_ORIGINS = True
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -81,6 +84,8 @@ SIMPLE_JWT = {
     "ALGORITHM": "HS256",
     "SIGNING_KEY": SECRET_KEY,
     "AUTH_HEADER_TYPES": ("Bearer",),
+    # Refresh tokens are checked against api.RevokedToken, filled by logout
+    "TOKEN_REFRESH_SERIALIZER": "api.tokens.ClaimsTokenRefreshSerializer",
 }
 
 TEMPLATES = [
@@ -106,14 +111,47 @@ WSGI_APPLICATION = 'timetablegenerator.wsgi.application'
 AUTH_USER_MODEL="api.CustomUser"
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
+# SQLite in WAL mode by default, PostgreSQL with DB_ENGINE=postgres.
+# See timetablegenerator/database.py for the DB_* environment variables.
 
 DATABASES = {
+    'default': database_config(os.environ, BASE_DIR),
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Local memory per process by default. Point BACKEND/LOCATION at a shared
+# cache such as Redis or Memcached to share timetable grids between workers.
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'timetable',
     }
 }
 
+# Cache alias and lifetime (seconds) of the rendered timetable grids
+TIMETABLE_CACHE_ALIAS = 'default'
+TIMETABLE_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+# Serve the hot read endpoints from crud/async_views.py. timetablegenerator/asgi.py
+# sets TIMETABLE_ASYNC_READS=1; WSGI deployments keep the sync DRF views.
+TIMETABLE_ASYNC_READS = os.environ.get('TIMETABLE_ASYNC_READS', '') == '1'
+
+
+# Timetable solver: worker processes for independent groups of semesters
+# (None uses every core) and the size below which it solves in-process
+TIMETABLE_SOLVER_WORKERS = None
+TIMETABLE_SOLVER_PARALLEL_MIN_CELLS = 2000
+
+# Generation worker: seconds between heartbeats of a running job, seconds without
+# one before another worker takes the job back, and tries before it is failed
+TIMETABLE_JOB_HEARTBEAT_INTERVAL = 10
+TIMETABLE_JOB_STALE_AFTER = 120
+TIMETABLE_JOB_MAX_ATTEMPTS = 3
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -155,3 +193,35 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Rows fetched per round trip while streaming timetable exports
+TIMETABLE_EXPORT_CHUNK_SIZE = 2000
+
+# Authenticated requests check users' active and role flags against a per-process
+# cache refreshed at most every AUTH_USER_CACHE_TTL seconds (0 trusts the token alone)
+AUTH_USER_CACHE_TTL = 30
+AUTH_USER_CACHE_SIZE = 10000
+
+# Expired logouts are deleted from api.RevokedToken after this many new ones
+AUTH_REVOKED_TOKENS_PURGE_EVERY = 100
+
+# Passwords are hashed with PBKDF2-SHA256 at PASSWORD_PBKDF2_ITERATIONS rounds (None keeps
+# Django's default). Changing it, or the first hasher, rehashes each password at its next login.
+PASSWORD_PBKDF2_ITERATIONS = None
+PASSWORD_HASHERS = [
+    'api.hashers.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+# Failed logins allowed per email and per client IP within the window (seconds)
+# before further attempts are refused without checking the password. The IP limit
+# is far above the email one because a school NAT puts many users on one address.
+AUTH_LOGIN_MAX_FAILURES_PER_EMAIL = 5
+AUTH_LOGIN_MAX_FAILURES_PER_IP = 200
+AUTH_LOGIN_FAILURE_WINDOW = 300
+AUTH_LOGIN_CACHE_ALIAS = 'default'
+
+# Reverse proxies in front of the app that append to X-Forwarded-For, so the
+# client IP is read from there rather than REMOTE_ADDR (0: clients connect directly)
+AUTH_TRUSTED_PROXY_COUNT = int(os.environ.get('AUTH_TRUSTED_PROXY_COUNT', 0))